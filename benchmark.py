@@ -0,0 +1,448 @@
+"""
+Polymarket Copy Trading Agent - Benchmark Suite
+Local mock CLOB + Polygon RPC + log stream, synthetic trade bursts, latency and throughput report
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import tempfile
+import tracemalloc
+from typing import Dict, List
+
+from aiohttp import web
+from colorama import init, Fore
+from eth_abi import encode, decode
+
+import main
+from main import CopyTradingAgent, Metrics
+
+init(autoreset=True)
+
+
+def random_address() -> str:
+    return '0x' + ''.join(random.choice('0123456789abcdef') for _ in range(40))
+
+
+class MockCLOB:
+    """In-process stand-in for clob.polymarket.com: /trades, /positions and order POST"""
+
+    def __init__(self):
+        self.trades: Dict[str, List[dict]] = {}
+        self.seq = 0
+        self.requests = 0
+        self.orders = 0
+        self.first_poll_at = 0.0
+        self.last_order_at = 0.0
+
+    def add_trade(self, wallet: str, prefix: str = 'burst', match_time: float = None, side: str = None) -> dict:
+        self.seq += 1
+        trade = {
+            'id': f"{prefix}-{self.seq}",
+            'asset_id': str(random.randint(1, 20)),
+            'side': side or ('BUY' if random.random() < 0.7 else 'SELL'),
+            'price': f"{random.uniform(0.05, 0.95):.3f}",
+            'size': f"{random.uniform(1, 100):.2f}",
+            'match_time': f"{match_time or time.time():.6f}",
+            'transaction_hash': '0x' + ''.join(random.choice('0123456789abcdef') for _ in range(64)),
+        }
+        self.trades.setdefault(wallet.lower(), []).append(trade)
+        return trade
+
+    async def get_trades(self, request):
+        self.requests += 1
+        self.first_poll_at = self.first_poll_at or time.perf_counter()
+        q = request.query
+        after = float(q.get('after', 0))
+        before = float(q.get('before', 'inf'))
+        rows = [
+            t for t in self.trades.get(q.get('maker', '').lower(), ())
+            if after < float(t['match_time']) < before
+        ]
+        rows.sort(key=lambda t: float(t['match_time']), reverse=True)
+        offset = int(q.get('offset', 0))
+        return web.json_response(rows[offset:offset + int(q.get('limit', 10))])
+
+    async def post_order(self, request):
+        await request.read()
+        self.orders += 1
+        self.last_order_at = time.perf_counter()
+        return web.json_response({'success': True, 'orderID': f"0x{self.orders:064x}", 'status': 'live'})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/trades', self.get_trades)
+        app.router.add_get('/positions', lambda r: web.json_response([]))
+        app.router.add_post('/order', self.post_order)
+        app.router.add_get('/tick-size', lambda r: web.json_response({'minimum_tick_size': 0.001}))
+        app.router.add_get('/neg-risk', lambda r: web.json_response({'neg_risk': False}))
+        app.router.add_get('/fee-rate', lambda r: web.json_response({'base_fee': 0}))
+        return app
+
+
+class MockRPC:
+    """Minimal Polygon JSON-RPC: chain id plus USDC balanceOf / Multicall3 aggregate3"""
+
+    def __init__(self, balance: float = 1_000_000):
+        self.raw_balance = int(balance * 10**6)
+        self.calls = 0
+        self.blocks: Dict[str, int] = {}  # block number (hex) -> timestamp, filled by MockStream
+
+    async def handle(self, request):
+        body = await request.json()
+        self.calls += 1
+        method = body.get('method')
+        if method == 'eth_chainId':
+            result = '0x89'
+        elif method == 'eth_getBlockByNumber':
+            number = body['params'][0]
+            result = {'number': number, 'timestamp': hex(self.blocks.get(number, int(time.time())))}
+        elif method == 'eth_call':
+            data = bytes.fromhex(body['params'][0]['data'][2:])
+            if data[:4].hex() == '70a08231':
+                result = '0x' + encode(['uint256'], [self.raw_balance]).hex()
+            else:
+                (calls,) = decode(['(address,bool,bytes)[]'], data[4:])
+                returns = [(True, encode(['uint256'], [self.raw_balance])) for _ in calls]
+                result = '0x' + encode(['(bool,bytes)[]'], [returns]).hex()
+        else:
+            result = None
+        return web.json_response({'jsonrpc': '2.0', 'id': body.get('id'), 'result': result})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/', self.handle)
+        return app
+
+
+class MockStream:
+    """WebSocket node for eth_subscribe('logs'): publishes each CLOB trade as an OrderFilled log,
+    and can drop every client and refuse reconnects to open a gap only REST can cover"""
+
+    def __init__(self, rpc: MockRPC):
+        self.rpc = rpc
+        self.sockets = set()
+        self.accepting = True
+        self.block = 50_000_000
+        self.subscriptions = 0
+
+    async def handle(self, request):
+        if not self.accepting:
+            return web.Response(status=503)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            req = json.loads(msg.data)
+            if req.get('method') == 'eth_subscribe':
+                self.subscriptions += 1
+                await ws.send_json({'jsonrpc': '2.0', 'id': req.get('id'), 'result': '0x1'})
+                self.sockets.add(ws)
+        self.sockets.discard(ws)
+        return ws
+
+    def order_filled(self, wallet: str, trade: dict) -> dict:
+        size, price = float(trade['size']), float(trade['price'])
+        tokens, usdc, asset = round(size * 10**6), round(size * price * 10**6), int(trade['asset_id'])
+        if trade['side'] == 'BUY':
+            amounts = [0, asset, usdc, tokens, 0]
+        else:
+            amounts = [asset, 0, tokens, usdc, 0]
+        self.block += 1
+        self.rpc.blocks[hex(self.block)] = int(float(trade['match_time']))
+        pad = lambda addr: '0x' + addr[2:].lower().rjust(64, '0')
+        return {
+            'address': main.TradeStream.EXCHANGES[0],
+            'topics': [main.TradeStream.ORDER_FILLED, '0x' + '00' * 32, pad(wallet), pad(random_address())],
+            'data': '0x' + encode(['uint256'] * 5, amounts).hex(),
+            'blockNumber': hex(self.block),
+            'transactionHash': trade['transaction_hash'],
+            'logIndex': '0x0',
+            'removed': False,
+        }
+
+    async def publish(self, wallet: str, trade: dict):
+        log = self.order_filled(wallet, trade)
+        message = {'jsonrpc': '2.0', 'method': 'eth_subscription', 'params': {'subscription': '0x1', 'result': log}}
+        for ws in list(self.sockets):
+            await ws.send_json(message)
+
+    async def drop(self):
+        self.accepting = False
+        for ws in list(self.sockets):
+            await ws.close()
+        self.sockets.clear()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/', self.handle)
+        return app
+
+
+async def start_server(app: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+
+def bench_config(wallets: List[str], args) -> dict:
+    followers = [
+        {
+            'MY_ADDRESS': random_address(),
+            'PRIVATE_KEY': '0x' + f"{i + 1:02x}" * 32,
+            'CLOB_API_KEY': 'bench-key',
+            'CLOB_API_SECRET': 'YmVuY2gtc2VjcmV0LWJlbmNoLXNlY3JldC1iZW5jaC0=',
+            'CLOB_API_PASSPHRASE': 'bench',
+        }
+        for i in range(args.followers - 1)
+    ]
+    return {
+        'MY_ADDRESS': random_address(),
+        'PRIVATE_KEY': '0x' + 'ab' * 32,
+        'WALLET_TO_COPY': wallets[0],
+        'TARGETS': wallets,
+        'POLYGON_RPC': f"http://127.0.0.1:{args.port + 1}",
+        'CLOB_HOST': f"http://127.0.0.1:{args.port}",
+        'CLOB_API_KEY': 'bench-key',
+        'CLOB_API_SECRET': 'YmVuY2gtc2VjcmV0LWJlbmNoLXNlY3JldC1iZW5jaC0=',
+        'CLOB_API_PASSPHRASE': 'bench',
+        'COPY_PERCENTAGE': 0.001,
+        'MIN_TRADE_SIZE': 1,
+        'MAX_TRADE_SIZE': 10,
+        'MONITOR_INTERVAL': args.interval,
+        'METRICS_LOG_INTERVAL': 0,
+        'NETTING_WINDOW_MS': args.netting_ms,
+        'STREAM_URL': f"ws://127.0.0.1:{args.port + 2}/" if args.stream else '',
+        'FOLLOWERS': followers,
+        'SIGNING_PROCESSES': args.signing_processes,
+    }
+
+
+async def loop_lag_probe(samples: List[float], period: float = 0.01):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(period)
+        samples.append(time.perf_counter() - start - period)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99), 'max': ordered[-1]}
+
+
+async def measure_memory(args, clob: MockCLOB) -> float:
+    """Traced bytes per followed wallet after construction and one poll round"""
+    wallets = [random_address() for _ in range(args.wallets)]
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    agent = CopyTradingAgent(bench_config(wallets, args))
+    await asyncio.gather(*(agent.poll_target(t) for t in agent.targets))
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    await agent.http.close()
+    return used / args.wallets
+
+
+async def measure_startup(args, clob: MockCLOB, stream: MockStream, timeout: float = 60.0) -> Dict[str, float]:
+    """Cold start of `main.py --headless` in a fresh interpreter: seconds to its first poll, and to the
+    order for a BUY placed the moment that poll arrives (history from before startup is never copied)"""
+    wallet = random_address()
+    clob.first_poll_at = 0.0
+    orders_before = clob.orders
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = os.path.join(tmp, 'config.json')
+        with open(config_path, 'w') as f:
+            json.dump(bench_config([wallet], args), f)
+        start = time.perf_counter()
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(main.__file__), '--headless', '--config', config_path,
+            cwd=tmp, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+        first_order = 0.0
+        traded = False
+        while time.perf_counter() - start < timeout and proc.returncode is None:
+            if clob.first_poll_at and not traded:
+                await stream.publish(wallet, clob.add_trade(wallet, prefix='startup', side='BUY'))
+                traded = True
+            if clob.orders > orders_before:
+                first_order = clob.last_order_at - start
+                break
+            await asyncio.sleep(0.005)
+        if proc.returncode is None:
+            proc.terminate()
+        await proc.wait()
+    first_poll = clob.first_poll_at - start if clob.first_poll_at else 0.0
+    return {'first_poll': first_poll, 'first_order': first_order}
+
+
+async def run_benchmark(args) -> dict:
+    clob, rpc = MockCLOB(), MockRPC()
+    stream = MockStream(rpc)
+    runners = [await start_server(clob.app(), args.port), await start_server(rpc.app(), args.port + 1),
+               await start_server(stream.app(), args.port + 2)]
+
+    bytes_per_wallet = await measure_memory(args, clob)
+    startup = await measure_startup(args, clob, stream)
+
+    wallets = [random_address() for _ in range(args.wallets)]
+    for wallet in wallets:
+        # One old trade per wallet so every cursor is established before the burst
+        clob.add_trade(wallet, prefix='seed', match_time=time.time() - 3600)
+
+    agent = CopyTradingAgent(bench_config(wallets, args))
+    running = asyncio.create_task(agent.run())
+    while any(not t.cursor for t in agent.targets) or not agent.ready.is_set():
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(args.interval * 2)
+
+    # Measure only the burst
+    main.metrics = Metrics()
+    orders_before = clob.orders
+    requests_before = clob.requests
+    lags: List[float] = []
+    probe = asyncio.create_task(loop_lag_probe(lags))
+
+    total = int(args.rate * args.duration)
+    start = time.perf_counter()
+    gap_ends = 0.0
+    for i in range(total):
+        if args.stream and args.gap and i == total // 2:
+            # Mid-burst outage: fills during the gap reach only the CLOB
+            await stream.drop()
+            gap_ends = time.perf_counter() + args.gap
+        if gap_ends and time.perf_counter() >= gap_ends:
+            stream.accepting, gap_ends = True, 0.0
+        wallet = random.choice(wallets)
+        trade = clob.add_trade(wallet)
+        await stream.publish(wallet, trade)
+        await asyncio.sleep(max(0.0, start + (i + 1) / args.rate - time.perf_counter()))
+    stream.accepting = True
+    await asyncio.sleep(args.drain)
+
+    probe.cancel()
+    running.cancel()
+    await asyncio.gather(running, return_exceptions=True)
+    for runner in runners:
+        await runner.cleanup()
+
+    m = main.metrics
+    orders = clob.orders - orders_before
+    busy = (clob.last_order_at - start) if orders else 0.0
+    return {
+        'wallets': args.wallets,
+        'followers': args.followers,
+        'stream': args.stream,
+        'subscriptions': stream.subscriptions,
+        'rate': args.rate,
+        'generated': total,
+        'detected': m.counters.get('trades_detected', 0),
+        'copied': m.counters.get('trades_copied', 0),
+        'orders': orders,
+        'netted': m.counters.get('netted_fills', 0),
+        'poll_requests': clob.requests - requests_before,
+        'throughput': orders / busy if busy else 0.0,
+        'detect_latency': percentiles(list(m.samples.get('fill_to_detect', ()))),
+        'ack_latency': percentiles(list(m.samples.get('fill_to_ack', ()))),
+        'loop_lag': percentiles(lags),
+        'bytes_per_wallet': bytes_per_wallet,
+        'startup': startup,
+        'errors': dict(m.errors),
+    }
+
+
+def print_report(r: dict):
+    ms = lambda p: f"p50 {p['p50']*1000:7.1f}ms  p95 {p['p95']*1000:7.1f}ms  p99 {p['p99']*1000:7.1f}ms  max {p['max']*1000:7.1f}ms"
+    print(f"\n{Fore.GREEN}{'='*70}")
+    print(f"{Fore.YELLOW}⏱  BENCHMARK: {r['wallets']} wallets → {r.get('followers', 1)} accounts @ {r['rate']:g} trades/s")
+    print(f"{Fore.GREEN}{'='*70}")
+    print(f"{Fore.WHITE}Trades:      {Fore.CYAN}{r['detected']}/{r['generated']} detected, {r['copied']} copied, {r['orders']} orders, {r['netted']} netted")
+    if r.get('stream'):
+        print(f"{Fore.WHITE}Stream:      {Fore.CYAN}{r['subscriptions']} subscriptions (reconnects + REST catch-up)")
+    print(f"{Fore.WHITE}Throughput:  {Fore.CYAN}{r['throughput']:.1f} orders/s ({r['poll_requests']} poll requests)")
+    print(f"{Fore.WHITE}Detection:   {Fore.CYAN}{ms(r['detect_latency'])}")
+    print(f"{Fore.WHITE}Fill → ack:  {Fore.CYAN}{ms(r['ack_latency'])}")
+    print(f"{Fore.WHITE}Loop lag:    {Fore.CYAN}{ms(r['loop_lag'])}")
+    print(f"{Fore.WHITE}Memory:      {Fore.CYAN}{r['bytes_per_wallet'] / 1024:.1f} KiB per wallet")
+    print(f"{Fore.WHITE}Cold start:  {Fore.CYAN}first poll {r['startup']['first_poll']*1000:.0f}ms, first order {r['startup']['first_order']*1000:.0f}ms")
+    if r['errors']:
+        print(f"{Fore.RED}Errors:      {r['errors']}")
+    print(f"{Fore.GREEN}{'='*70}\n")
+
+
+def compare(r: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than tolerance"""
+    regressions = []
+    for key in ('detect_latency', 'ack_latency', 'loop_lag'):
+        old, new = baseline[key]['p95'], r[key]['p95']
+        if old and new > old * (1 + tolerance):
+            regressions.append(f"{key} p95 {old*1000:.1f}ms → {new*1000:.1f}ms")
+    if baseline['throughput'] and r['throughput'] < baseline['throughput'] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['throughput']:.1f} → {r['throughput']:.1f} orders/s")
+    if baseline['bytes_per_wallet'] and r['bytes_per_wallet'] > baseline['bytes_per_wallet'] * (1 + tolerance):
+        regressions.append(f"memory {baseline['bytes_per_wallet']:.0f} → {r['bytes_per_wallet']:.0f} bytes/wallet")
+    old = baseline.get('startup', {}).get('first_poll')
+    if old and r['startup']['first_poll'] > old * (1 + tolerance):
+        regressions.append(f"time to first poll {old*1000:.0f}ms → {r['startup']['first_poll']*1000:.0f}ms")
+    if r['detected'] < r['generated']:
+        regressions.append(f"missed {r['generated'] - r['detected']} trades")
+    if r['detected'] > r['generated']:
+        regressions.append(f"detected {r['detected'] - r['generated']} fills twice")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the copy trading agent against local mock servers")
+    parser.add_argument('--wallets', type=int, default=10, help="followed wallets")
+    parser.add_argument('--rate', type=float, default=20.0, help="synthetic trades per second across all wallets")
+    parser.add_argument('--duration', type=float, default=10.0, help="burst length in seconds")
+    parser.add_argument('--interval', type=float, default=0.5, help="MONITOR_INTERVAL for the agent")
+    parser.add_argument('--drain', type=float, default=3.0, help="seconds to wait for in-flight copies after the burst")
+    parser.add_argument('--followers', type=int, default=1, help="our accounts each detected trade fans out to")
+    parser.add_argument('--signing-processes', type=int, default=0, help="SIGNING_PROCESSES for the agent (0 = threads)")
+    parser.add_argument('--stream', action='store_true', help="also deliver fills over a mock eth_subscribe WebSocket (port + 2)")
+    parser.add_argument('--gap', type=float, default=1.5, help="with --stream, seconds the stream is down mid-burst (0 = no outage)")
+    parser.add_argument('--netting-ms', type=float, default=0, help="NETTING_WINDOW_MS for the agent (0 = off)")
+    parser.add_argument('--port', type=int, default=18080, help="mock CLOB port (RPC uses port + 1)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', metavar='FILE', help="write the report as JSON")
+    parser.add_argument('--compare', metavar='FILE', help="fail if worse than a saved report")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative regression for --compare")
+    parser.add_argument('--verbose', action='store_true', help="keep the agent's INFO logging")
+    return parser.parse_args()
+
+
+def bench_main():
+    args = parse_args()
+    random.seed(args.seed)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"{Fore.GREEN}✓ Saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            for line in regressions:
+                print(f"{Fore.RED}❌ Regression: {line}")
+            sys.exit(1)
+        print(f"{Fore.GREEN}✓ No regressions vs {args.compare}")
+
+
+if __name__ == "__main__":
+    bench_main()
@@ -6,35 +6,63 @@ Intelligent BUY + SELL copy trading with position management
 import os
 import sys
 import json
+import argparse
+import itertools
 import time
+import bisect
+import random
+import signal
+import threading
+import traceback
 import asyncio
 import aiohttp
 from datetime import datetime
 from typing import Optional, Dict, List, Set
 import logging
+import sqlite3
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
-# Auto-install dependencies if missing
+# Heavy SDKs (web3, eth-account, py-clob-client, telegram, colorama) are imported where their
+# feature is first used, so a headless restart reaches its first poll without loading them
+REQUIRED_PACKAGES = {
+    'web3': 'web3', 'eth_account': 'eth-account', 'py_clob_client': 'py-clob-client',
+    'telegram': 'python-telegram-bot', 'colorama': 'colorama', 'requests': 'requests',
+}
+
+# Optional fast JSON decoder
 try:
-    from web3 import Web3
-    from eth_account import Account
-    from py_clob_client.client import ClobClient
-    from py_clob_client.clob_types import OrderArgs, OrderType
-    from telegram import Bot
-    from telegram.error import TelegramError
-    from colorama import init, Fore, Style, Back
+    import orjson
+    json_loads = orjson.loads
 except ImportError:
-    print("📦 Installing required packages...")
-    os.system(f"{sys.executable} -m pip install web3 eth-account py-clob-client python-telegram-bot colorama aiohttp requests --quiet")
-    from web3 import Web3
-    from eth_account import Account
-    from py_clob_client.client import ClobClient
-    from py_clob_client.clob_types import OrderArgs, OrderType
-    from telegram import Bot
-    from telegram.error import TelegramError
+    json_loads = json.loads
+
+
+class _NoColor:
+    """Stand-in for colorama's Fore/Style/Back until colors are enabled (never, in headless mode)"""
+    
+    def __getattr__(self, name: str) -> str:
+        return ''
+
+
+Fore = Style = Back = _NoColor()
+
+
+def enable_colors():
+    global Fore, Style, Back
     from colorama import init, Fore, Style, Back
+    init(autoreset=True)
+
 
-init(autoreset=True)
+def install_missing():
+    """Interactive setup only: pip-install any missing dependency before the wizard runs"""
+    import importlib.util
+    missing = [pkg for module, pkg in REQUIRED_PACKAGES.items() if importlib.util.find_spec(module) is None]
+    if missing:
+        print("📦 Installing required packages...")
+        os.system(f"{sys.executable} -m pip install {' '.join(missing)} --quiet")
 
 logging.basicConfig(
     level=logging.INFO,
@@ -47,6 +75,238 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class Metrics:
+    """Per-stage latency windows and counters for the copy path, rendered as Prometheus text"""
+    
+    QUANTILES = (0.5, 0.95, 0.99)
+    
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self.samples: Dict[str, deque] = {}
+        self.sums: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+    
+    def observe(self, stage: str, seconds: float):
+        if stage not in self.samples:
+            self.samples[stage] = deque(maxlen=self.window)
+            self.sums[stage] = 0.0
+            self.counts[stage] = 0
+        self.samples[stage].append(seconds)
+        self.sums[stage] += seconds
+        self.counts[stage] += 1
+    
+    def incr(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+    
+    def gauge(self, name: str, value: float):
+        self.gauges[name] = value
+    
+    def error(self, stage: str):
+        self.errors[stage] = self.errors.get(stage, 0) + 1
+    
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+    
+    def quantiles(self, stage: str) -> Dict[float, float]:
+        ordered = sorted(self.samples.get(stage, ()))
+        if not ordered:
+            return {}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in self.QUANTILES}
+    
+    def render(self) -> str:
+        lines = ["# TYPE copybot_stage_seconds summary"]
+        for stage in sorted(self.samples):
+            for q, v in self.quantiles(stage).items():
+                lines.append(f'copybot_stage_seconds{{stage="{stage}",quantile="{q}"}} {v:.6f}')
+            lines.append(f'copybot_stage_seconds_sum{{stage="{stage}"}} {self.sums[stage]:.6f}')
+            lines.append(f'copybot_stage_seconds_count{{stage="{stage}"}} {self.counts[stage]}')
+        lines.append("# TYPE copybot_errors_total counter")
+        for stage in sorted(self.errors):
+            lines.append(f'copybot_errors_total{{stage="{stage}"}} {self.errors[stage]}')
+        for name in sorted(self.counters):
+            lines.append(f"# TYPE copybot_{name}_total counter")
+            lines.append(f"copybot_{name}_total {self.counters[name]}")
+        for name in sorted(self.gauges):
+            lines.append(f"# TYPE copybot_{name} gauge")
+            lines.append(f"copybot_{name} {self.gauges[name]:g}")
+        return "\n".join(lines) + "\n"
+    
+    def summary(self) -> str:
+        parts = []
+        for stage in sorted(self.samples):
+            q = self.quantiles(stage)
+            parts.append(f"{stage} p50={q[0.5]*1000:.1f}ms p95={q[0.95]*1000:.1f}ms p99={q[0.99]*1000:.1f}ms n={self.counts[stage]}")
+        if self.gauges:
+            parts.append(" ".join(f"{k}={v:g}" for k, v in sorted(self.gauges.items())))
+        if self.errors:
+            parts.append("errors " + ", ".join(f"{k}={v}" for k, v in sorted(self.errors.items())))
+        return " | ".join(parts) or "no samples yet"
+    
+    async def serve(self, port: int, host: str = '127.0.0.1', routes: tuple = ()):
+        """Serve /metrics, plus any extra (method, path, handler) routes such as the diagnostics endpoints"""
+        from aiohttp import web
+        
+        async def handle(request):
+            return web.Response(text=self.render(), content_type='text/plain')
+        
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        for method, path, handler in routes:
+            app.router.add_route(method, path, handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"📊 Metrics on http://{host}:{port}/metrics")
+        return runner
+    
+    async def log_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f"📊 {self.summary()}")
+
+
+metrics = Metrics()
+
+
+class Diagnostics:
+    """Event-loop lag monitor, stack dumps of callbacks that block the loop, and an on-demand
+    sampling profiler writing collapsed stacks (flamegraph.pl / speedscope input)"""
+    
+    def __init__(self, block_threshold: float = 0.1, lag_interval: float = 0.05,
+                 sample_interval: float = 0.005, profile_dir: str = '.'):
+        self.block_threshold = block_threshold
+        self.lag_interval = lag_interval
+        self.sample_interval = sample_interval
+        self.profile_dir = profile_dir
+        self.loop_thread: Optional[int] = None
+        self.heartbeat = 0.0  # last time the loop ran the lag probe; read by the watchdog thread
+        self.samples: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._profiler: Optional[threading.Thread] = None
+        self._profiler_stop = threading.Event()
+    
+    def start(self) -> asyncio.Task:
+        """Start the watchdog thread and SIGUSR1 profiler toggle; returns the lag probe task"""
+        loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+        sig = getattr(signal, 'SIGUSR1', None)
+        if sig:
+            try:
+                loop.add_signal_handler(sig, self.toggle_profiler)
+            except (NotImplementedError, RuntimeError):
+                pass
+        logger.info(f"🩺 Diagnostics on: blocking threshold {self.block_threshold * 1000:.0f}ms")
+        return asyncio.create_task(self._probe())
+    
+    async def _probe(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.lag_interval)
+            self.heartbeat = now = time.monotonic()
+            lag = now - start - self.lag_interval
+            metrics.observe('loop_lag', lag)
+            if lag >= self.block_threshold:
+                metrics.incr('loop_stalls')
+                logger.warning(f"🐢 Event loop stalled for {lag * 1000:.0f}ms")
+    
+    def _watch(self):
+        # Runs off the loop: while the loop is stuck, its thread's stack shows the blocking call
+        reported = 0.0
+        while not self._stop.wait(self.block_threshold / 2):
+            beat = self.heartbeat
+            if beat == reported or time.monotonic() - beat - self.lag_interval < self.block_threshold:
+                continue
+            reported = beat
+            frame = sys._current_frames().get(self.loop_thread)
+            if frame is not None:
+                stack = ''.join(traceback.format_stack(frame))
+                logger.warning(f"🐢 Event loop blocked > {self.block_threshold * 1000:.0f}ms in:\n{stack}")
+    
+    @property
+    def profiling(self) -> bool:
+        return self._profiler is not None
+    
+    def start_profiler(self):
+        if self.profiling:
+            return
+        self.samples = {}
+        self._profiler_stop.clear()
+        self._profiler = threading.Thread(target=self._sample, name='profiler', daemon=True)
+        self._profiler.start()
+        logger.info(f"🔬 Profiler started ({1 / self.sample_interval:.0f} Hz)")
+    
+    def _sample(self):
+        skip = {threading.get_ident(), self._watchdog.ident if self._watchdog else None}
+        while not self._profiler_stop.wait(self.sample_interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident in skip:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, 'thread'))
+                key = ';'.join(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+    
+    def stop_profiler(self) -> Optional[str]:
+        """Stop sampling and write the collapsed stacks; returns the file path"""
+        if not self.profiling:
+            return None
+        self._profiler_stop.set()
+        self._profiler.join()
+        self._profiler = None
+        path = os.path.join(self.profile_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, 'w') as f:
+            f.write(self.folded())
+        logger.info(f"🔬 Profiler stopped: {sum(self.samples.values())} samples → {path}")
+        return path
+    
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+    
+    def toggle_profiler(self):
+        if self.profiling:
+            self.stop_profiler()
+        else:
+            self.start_profiler()
+    
+    def routes(self) -> tuple:
+        """HTTP toggles for the metrics server: /debug/profile/start, and /debug/profile/stop returning the stacks"""
+        from aiohttp import web
+        
+        async def start(request):
+            self.start_profiler()
+            return web.Response(text="profiling\n")
+        
+        async def stop(request):
+            path = self.stop_profiler()
+            return web.Response(text=self.folded() if path else "profiler not running\n", content_type='text/plain')
+        
+        return (('GET', '/debug/profile/start', start), ('GET', '/debug/profile/stop', stop))
+    
+    def close(self):
+        self._stop.set()
+        self.stop_profiler()
+
+
 class WalletManager:
     """Wallet creation and management"""
     
@@ -64,6 +324,7 @@ class WalletManager:
     
     @staticmethod
     def create_wallet():
+        from eth_account import Account
         print(f"\n{Fore.YELLOW}🔐 Creating new wallet...")
         account = Account.create()
         
@@ -83,9 +344,9 @@ class WalletManager:
 class ConfigWizard:
     """Interactive setup wizard"""
     
-    def __init__(self):
+    def __init__(self, config_file: str = 'config.json'):
         self.config = {}
-        self.config_file = 'config.json'
+        self.config_file = config_file
     
     def clear_screen(self):
         os.system('clear' if os.name != 'nt' else 'cls')
@@ -113,6 +374,7 @@ class ConfigWizard:
     def validate_private_key(self, key: str) -> tuple:
         if not key or not key.startswith('0x') or len(key) != 66:
             return False, "Invalid private key"
+        from eth_account import Account
         try:
             Account.from_key(key)
             return True, ""
@@ -135,6 +397,7 @@ class ConfigWizard:
         else:
             print(f"\n{Fore.WHITE}Import MetaMask wallet:")
             print(f"{Fore.YELLOW}MetaMask → ⋮ → Account Details → Export Private Key")
+            from eth_account import Account
             private_key = self.get_input("\nPaste private key:", validator=self.validate_private_key)
             account = Account.from_key(private_key)
             print(f"\n{Fore.GREEN}✓ Imported: {Fore.WHITE}{account.address}")
@@ -206,6 +469,7 @@ class ConfigWizard:
         chat_id = self.get_input("Chat ID:")
         
         try:
+            from telegram import Bot
             bot = Bot(token=token)
             asyncio.run(bot.send_message(chat_id=chat_id, text="🎉 Bot connected!"))
             print(f"{Fore.GREEN}✓ Test message sent!")
@@ -296,6 +560,1360 @@ class ConfigWizard:
         return config
 
 
+class Trade:
+    """One fill by a followed wallet, holding only the fields the copy path reads, converted once"""
+    __slots__ = ('id', 'asset_id', 'side', 'price', 'size', 'match_time', 'market', 'tx', 'fills')
+    
+    def __init__(self, id: str, asset_id: str, side: str, price: float, size: float, match_time: float,
+                 market: str = '', tx: str = '', fills: float = 1.0):
+        self.id = id
+        self.asset_id = asset_id
+        self.side = side
+        self.price = price
+        self.size = size
+        self.match_time = match_time
+        self.market = market  # condition id; empty when only the on-chain fill is known
+        self.tx = tx
+        self.fills = fills  # how many fills' worth of BUY this copies; set by netting
+    
+    @classmethod
+    def from_api(cls, row: dict) -> 'Trade':
+        """Raises ValueError/TypeError on a row with an unusable price, size or side"""
+        side = str(row.get('side') or 'BUY').upper()
+        if side not in ('BUY', 'SELL'):
+            raise ValueError(f"bad side {side!r}")
+        return cls(
+            row.get('id'), str(row.get('asset_id')), side,
+            float(row.get('price', 0.5)), float(row.get('size', 0)), trade_timestamp(row),
+            row.get('market') or '', (row.get('transaction_hash') or '').lower()
+        )
+    
+    @property
+    def key(self) -> str:
+        # REST and the stream give one fill different ids; tx hash + token + size matches them up
+        return f"{self.tx}:{self.asset_id}:{self.size:.6f}" if self.tx else self.id
+    
+    def to_dict(self) -> dict:
+        return {s: getattr(self, s) for s in self.__slots__}
+
+
+def decode_trade_page(body: bytes) -> tuple:
+    """Raw /trades response -> (Trade records, next_cursor or None); the decoded dicts are dropped at once.
+    Malformed rows are skipped (and counted) so one bad fill can't stall the wallet's cursor"""
+    data = json_loads(body)
+    next_cursor = None
+    if isinstance(data, dict):
+        next_cursor = data.get('next_cursor')
+        if next_cursor == 'LTE=':
+            next_cursor = None
+        data = data.get('data') or []
+    trades = []
+    for row in data:
+        if not isinstance(row, dict):
+            continue
+        try:
+            trades.append(Trade.from_api(row))
+        except (TypeError, ValueError) as e:
+            metrics.error('parse')
+            logger.warning(f"Skipping malformed trade {row.get('id')}: {e}")
+    return trades, next_cursor
+
+
+class TargetWallet:
+    """A followed wallet with its own copy settings and trade cursor"""
+    
+    def __init__(self, address: str, copy_pct: float, min_trade: float, max_trade: float):
+        self.address = address
+        self.copy_pct = copy_pct
+        self.min_trade = min_trade
+        self.max_trade = max_trade
+        # High-water mark: newest trade timestamp seen, plus the ids seen at that timestamp
+        self.cursor = 0.0
+        self.cursor_ids: Set[str] = set()
+        self.delay = 0.0  # current adaptive poll interval
+    
+    def is_new(self, trade: Trade) -> bool:
+        ts = trade.match_time
+        return ts > self.cursor or (ts == self.cursor and trade.id not in self.cursor_ids)
+    
+    def advance(self, trades: List[Trade]):
+        for trade in trades:
+            ts = trade.match_time
+            if ts > self.cursor:
+                self.cursor = ts
+                self.cursor_ids = {trade.id}
+            elif ts == self.cursor:
+                self.cursor_ids.add(trade.id)
+    
+    @property
+    def short(self) -> str:
+        return f"{self.address[:10]}..."
+    
+    @classmethod
+    def from_config(cls, entry, config: dict) -> 'TargetWallet':
+        """Build from a TARGETS entry: an address string or a dict overriding the global settings"""
+        if isinstance(entry, str):
+            entry = {'WALLET': entry}
+        return cls(
+            address=entry['WALLET'],
+            copy_pct=float(entry.get('COPY_PERCENTAGE', config['COPY_PERCENTAGE'])),
+            min_trade=float(entry.get('MIN_TRADE_SIZE', config['MIN_TRADE_SIZE'])),
+            max_trade=float(entry.get('MAX_TRADE_SIZE', config['MAX_TRADE_SIZE']))
+        )
+
+
+class DedupIndex:
+    """Fixed-capacity set of trade ids, evicting the oldest first, optionally persisted"""
+    
+    def __init__(self, capacity: int = 5000, path: str = ''):
+        self.capacity = capacity
+        self.path = path
+        self._ids = OrderedDict()
+        self._file = None
+        self._lines = 0
+        if path:
+            self._load()
+            self._file = open(path, 'a', buffering=1)
+    
+    def __contains__(self, tid) -> bool:
+        return tid in self._ids
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __iter__(self):
+        return iter(self._ids)
+    
+    def restore(self, ids):
+        """Load ids from another store without re-persisting them"""
+        for tid in ids:
+            self._ids[tid] = None
+            self._ids.move_to_end(tid)
+        while len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+    
+    def add(self, tid) -> bool:
+        """Record an id; False if it was already present"""
+        if tid in self._ids:
+            return False
+        self._ids[tid] = None
+        if len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+        if self._file:
+            self._file.write(f"{tid}\n")
+            self._lines += 1
+            if self._lines > 2 * self.capacity:
+                self._compact()
+        return True
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            lines = [line.strip() for line in f if line.strip()]
+        for tid in lines[-self.capacity:]:
+            self._ids[tid] = None
+        self._lines = len(lines)
+        if self._lines > 2 * self.capacity:
+            self._compact()
+    
+    def _compact(self):
+        # Rewrite the log with only the ids still held, then swap it in atomically
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            f.writelines(f"{tid}\n" for tid in self._ids)
+        os.replace(tmp, self.path)
+        self._lines = len(self._ids)
+        if self._file:
+            self._file.close()
+            self._file = open(self.path, 'a', buffering=1)
+    
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class BalanceReader:
+    """Async USDC balance reads; concurrent requests within a short window share one RPC call"""
+    
+    USDC = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"
+    MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+    ERC20_ABI = [{"constant":True,"inputs":[{"name":"_owner","type":"address"}],"name":"balanceOf","outputs":[{"name":"balance","type":"uint256"}],"type":"function"}]
+    MULTICALL3_ABI = [{"inputs":[{"components":[{"name":"target","type":"address"},{"name":"allowFailure","type":"bool"},{"name":"callData","type":"bytes"}],"name":"calls","type":"tuple[]"}],"name":"aggregate3","outputs":[{"components":[{"name":"success","type":"bool"},{"name":"returnData","type":"bytes"}],"name":"returnData","type":"tuple[]"}],"stateMutability":"payable","type":"function"}]
+    BALANCE_OF = bytes.fromhex("70a08231")
+    
+    def __init__(self, rpc_url: str, window: float = 0.025):
+        self.rpc_url = rpc_url
+        self.window = window
+        self.w3 = None
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._flush_task = None
+    
+    def connect(self):
+        """Import web3 and build the contracts; blocking, so callers run it off the event loop"""
+        from web3 import AsyncWeb3, AsyncHTTPProvider, Web3
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(self.rpc_url))
+        self.usdc = self.w3.eth.contract(address=Web3.to_checksum_address(self.USDC), abi=self.ERC20_ABI)
+        self.multicall = self.w3.eth.contract(address=Web3.to_checksum_address(self.MULTICALL3), abi=self.MULTICALL3_ABI)
+        self.checksum = Web3.to_checksum_address
+    
+    async def get(self, address: str) -> float:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(self.checksum(address), []).append(fut)
+        if not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush())
+        return await fut
+    
+    async def _flush(self):
+        await asyncio.sleep(self.window)
+        pending, self._pending, self._flush_task = self._pending, {}, None
+        try:
+            balances = await self._read(list(pending))
+        except Exception as e:
+            for futs in pending.values():
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_exception(e)
+            return
+        for address, futs in pending.items():
+            for fut in futs:
+                if not fut.done():
+                    fut.set_result(balances[address])
+    
+    async def _read(self, addresses: List[str]) -> Dict[str, float]:
+        if len(addresses) == 1:
+            bal = await self.usdc.functions.balanceOf(addresses[0]).call()
+            return {addresses[0]: bal / 10**6}
+        
+        # Several wallets: one Multicall3 round-trip instead of one eth_call each
+        usdc = self.usdc.address
+        calls = [(usdc, True, self.BALANCE_OF + bytes.fromhex(a[2:].lower().rjust(64, '0'))) for a in addresses]
+        results = await self.multicall.functions.aggregate3(calls).call()
+        return {
+            a: int.from_bytes(data, 'big') / 10**6 if ok else 0.0
+            for a, (ok, data) in zip(addresses, results)
+        }
+
+
+class HttpPool:
+    """One managed outbound HTTP layer: a tuned aiohttp connector shared by the agent and web3,
+    plus the same pool limits applied to the CLOB SDK's own httpx client"""
+    
+    def __init__(self, size: int = 100, per_host: int = 20, keepalive: float = 60.0,
+                 dns_ttl: int = 300, http2: bool = True):
+        self.size = size
+        self.per_host = per_host
+        self.keepalive = keepalive
+        self.dns_ttl = dns_ttl
+        self.http2 = http2
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    def session(self) -> aiohttp.ClientSession:
+        if not self._session or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.size,
+                limit_per_host=self.per_host,
+                keepalive_timeout=self.keepalive,
+                ttl_dns_cache=self.dns_ttl,
+                use_dns_cache=True,
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+    
+    def tune_sdk(self):
+        """Swap py-clob-client's module-level httpx client for one with our limits (HTTP/2 if h2 is present)"""
+        import httpx
+        from py_clob_client.http_helpers import helpers
+        
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                http2 = False
+        limits = httpx.Limits(max_connections=self.size, max_keepalive_connections=self.per_host,
+                              keepalive_expiry=self.keepalive)
+        helpers._http_client = httpx.Client(http2=http2, limits=limits, timeout=10.0)
+    
+    async def attach_web3(self, w3):
+        await w3.provider.cache_async_session(self.session())
+    
+    async def warm(self, urls: List[str], per_host: int = 2):
+        """Open connections (DNS + TCP + TLS) before the first trade needs them"""
+        async def touch(url):
+            try:
+                async with self.session().head(url, timeout=aiohttp.ClientTimeout(total=5)) as r:
+                    await r.read()
+            except Exception as e:
+                logger.debug(f"Warm-up of {url} failed: {e}")
+        
+        with metrics.time('warmup'):
+            await asyncio.gather(*(touch(u) for u in urls for _ in range(per_host)))
+    
+    async def close(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+
+_order_builders: Dict[str, object] = {}  # address -> py_clob_client OrderBuilder, per signing process
+
+
+def _signer_init(keys: List[str], chain_id: int):
+    # Runs once per signing process: one order builder per follower key
+    from py_clob_client.order_builder.builder import OrderBuilder
+    from py_clob_client.signer import Signer
+    for key in keys:
+        builder = OrderBuilder(Signer(key, chain_id))
+        _order_builders[builder.signer.address()] = builder
+
+
+def _sign_order(address: str, order_args, tick_size: str, neg_risk: bool):
+    from py_clob_client.clob_types import CreateOrderOptions
+    options = CreateOrderOptions(tick_size=tick_size, neg_risk=neg_risk)
+    return _order_builders[address].create_order(order_args, options)
+
+
+class OrderExecutor:
+    """Bounded order queue: signs on a thread pool and posts over the shared aiohttp session"""
+    
+    def __init__(self, client, get_session, workers: int = 4, queue_size: int = 100, sign_pool=None):
+        self.client = client
+        self.get_session = get_session
+        self.sign_pool = sign_pool  # optional process pool started with _signer_init
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='signer')
+        self._tasks: List[asyncio.Task] = []
+    
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    async def submit(self, order_args, order_type=None):
+        """Queue an order (waiting while the queue is full) and return the exchange response"""
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((order_args, order_type or 'GTC', fut, time.perf_counter()))
+        return await fut
+    
+    async def _worker(self):
+        while True:
+            order_args, order_type, fut, queued_at = await self.queue.get()
+            try:
+                metrics.observe('order_queue', time.perf_counter() - queued_at)
+                with metrics.time('sign'):
+                    signed = await self._sign(order_args)
+                with metrics.time('post'):
+                    resp = await self._post(signed, order_type)
+                if not fut.done():
+                    fut.set_result(resp)
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+            finally:
+                self.queue.task_done()
+    
+    async def _sign(self, order_args):
+        loop = asyncio.get_running_loop()
+        if not self.sign_pool:
+            return await loop.run_in_executor(self.pool, self.client.create_order, order_args)
+        from py_clob_client.utilities import price_valid
+        # Market lookups stay here (cached by the client); only the EIP-712 signing crosses processes
+        tick_size, neg_risk, fee_rate = await loop.run_in_executor(self.pool, self._order_options, order_args.token_id)
+        if not price_valid(order_args.price, tick_size):
+            raise Exception(f"price ({order_args.price}), min: {tick_size} - max: {1 - float(tick_size)}")
+        order_args.fee_rate_bps = fee_rate
+        address = self.client.get_address()
+        return await loop.run_in_executor(self.sign_pool, _sign_order, address, order_args, tick_size, neg_risk)
+    
+    def _order_options(self, token_id: str) -> tuple:
+        client = self.client
+        return client.get_tick_size(token_id), client.get_neg_risk(token_id), client.get_fee_rate_bps(token_id)
+    
+    async def _post(self, signed, order_type):
+        from py_clob_client.clob_types import RequestArgs
+        from py_clob_client.endpoints import POST_ORDER
+        from py_clob_client.headers.headers import create_level_2_headers
+        from py_clob_client.utilities import order_to_json
+        client = self.client
+        if not client.creds or client.can_builder_auth():
+            # Let the SDK handle auth flows we don't replicate, off the event loop
+            return await asyncio.get_running_loop().run_in_executor(self.pool, client.post_order, signed, order_type)
+        
+        body = order_to_json(signed, client.creds.api_key, order_type)
+        serialized = json.dumps(body, separators=(",", ":"), ensure_ascii=False)
+        request_args = RequestArgs(method="POST", request_path=POST_ORDER, body=body, serialized_body=serialized)
+        headers = create_level_2_headers(client.signer, client.creds, request_args)
+        headers['Content-Type'] = 'application/json'
+        
+        url = f"{client.host}{POST_ORDER}"
+        async with self.get_session().post(url, data=serialized, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as r:
+            if r.status != 200:
+                raise Exception(f"Order rejected ({r.status}): {await r.text()}")
+            return await r.json()
+    
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self.pool.shutdown(wait=False)
+
+
+class TradeStream:
+    """Streams target fills from CTF Exchange OrderFilled logs over a WebSocket RPC"""
+    
+    ORDER_FILLED = "0xd0a08e8c493f9c94f29311604c9de1b4e8c8d4c06bd0c789af57f2d65bfec0f6"
+    EXCHANGES = [
+        "0x4bFb41d5B3570DeFd03C39a9A4D8dE6Bd8B8982E",  # CTF Exchange
+        "0xC5d563A36AE78145C45a50134d48A1215220f80a",  # Neg Risk CTF Exchange
+    ]
+    
+    def __init__(self, url: str, targets: List['TargetWallet'], on_trade, get_session,
+                 rpc_url: str = '', on_connect=None, exchanges: Optional[List[str]] = None):
+        self.url = url
+        self.targets = {t.address.lower(): t for t in targets}
+        self.on_trade = on_trade
+        self.get_session = get_session
+        self.rpc_url = rpc_url  # HTTP JSON-RPC for block timestamps when logs don't carry them
+        self.on_connect = on_connect  # async () -> None, REST catch-up run after each (re)subscribe
+        self.exchanges = exchanges or self.EXCHANGES
+        self.connected = False
+        self.block_times: Dict[str, float] = {}
+    
+    def subscribe_request(self) -> dict:
+        makers = ['0x' + addr[2:].rjust(64, '0') for addr in self.targets]
+        return {
+            'jsonrpc': '2.0', 'id': 1, 'method': 'eth_subscribe',
+            'params': ['logs', {'address': self.exchanges, 'topics': [self.ORDER_FILLED, None, makers]}]
+        }
+    
+    def decode(self, log: dict) -> tuple:
+        """OrderFilled log -> (Trade, target), or (None, None); match_time is filled in by block_time()"""
+        topics = log.get('topics') or []
+        if log.get('removed') or len(topics) < 3 or topics[0].lower() != self.ORDER_FILLED:
+            return None, None
+        target = self.targets.get('0x' + topics[2][-40:].lower())
+        data = bytes.fromhex(log['data'][2:])
+        if not target or len(data) < 160:
+            return None, None
+        maker_asset, taker_asset, maker_amount, taker_amount = (
+            int.from_bytes(data[i:i + 32], 'big') for i in range(0, 128, 32)
+        )
+        if not maker_amount or not taker_amount:
+            return None, None
+        
+        # Asset id 0 is USDC: the maker paying USDC is buying the outcome token
+        if maker_asset == 0:
+            side, asset, size, price = 'BUY', taker_asset, taker_amount, maker_amount / taker_amount
+        else:
+            side, asset, size, price = 'SELL', maker_asset, maker_amount, taker_amount / maker_amount
+        
+        tx = (log.get('transactionHash') or '').lower()
+        trade_id = f"{tx}:{int(log.get('logIndex', '0x0'), 16)}"
+        return Trade(trade_id, str(asset), side, price, size / 10**6, 0.0, tx=tx), target
+    
+    async def block_time(self, log: dict) -> float:
+        """Timestamp of the log's block: from the log if the node includes it, else eth_getBlockByNumber (cached)"""
+        if log.get('blockTimestamp'):
+            return float(int(log['blockTimestamp'], 16))
+        number = log.get('blockNumber')
+        cached = self.block_times.get(number)
+        if cached is not None:
+            return cached
+        try:
+            payload = {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_getBlockByNumber', 'params': [number, False]}
+            async with self.get_session().post(self.rpc_url, json=payload, timeout=aiohttp.ClientTimeout(total=5)) as r:
+                block = (await r.json()).get('result') or {}
+            ts = float(int(block['timestamp'], 16))
+        except Exception as e:
+            logger.debug(f"Block time lookup failed for {number}: {e}")
+            return time.time()
+        if len(self.block_times) > 1024:
+            self.block_times.clear()
+        self.block_times[number] = ts
+        return ts
+    
+    async def run(self):
+        backoff = 1
+        while True:
+            try:
+                async with self.get_session().ws_connect(self.url, heartbeat=30) as ws:
+                    await ws.send_json(self.subscribe_request())
+                    ack = await ws.receive_json(timeout=10)
+                    if 'error' in ack:
+                        raise Exception(ack['error'])
+                    
+                    # eth_subscribe doesn't replay past logs: sweep REST for fills missed while down.
+                    # Logs arriving meanwhile wait in the socket buffer, so the cursor can't skip the gap
+                    if self.on_connect:
+                        await self.on_connect()
+                    self.connected = True
+                    backoff = 1
+                    logger.info("📡 Trade stream connected")
+                    
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            break
+                        log = json_loads(msg.data).get('params', {}).get('result')
+                        if log:
+                            trade, target = self.decode(log)
+                            if trade:
+                                trade.match_time = await self.block_time(log)
+                                self.on_trade(trade, target)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Trade stream error: {e}")
+            
+            if self.connected:
+                logger.warning("Trade stream disconnected, falling back to polling")
+            self.connected = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+
+class TradeScheduler:
+    """Runs copy jobs under a global concurrency cap, strictly in arrival order per (account, token) lane"""
+    
+    def __init__(self, max_concurrent: int = 8):
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.lanes: Dict[tuple, deque] = {}
+        self.tasks: Set[asyncio.Task] = set()
+        self.queued = 0
+        self.running = 0
+    
+    def submit(self, key: tuple, job):
+        """Schedule job (a coroutine function) behind any pending jobs for the same key"""
+        self.queued += 1
+        lane = self.lanes.get(key)
+        if lane is not None:
+            lane.append(job)
+        else:
+            self.lanes[key] = deque([job])
+            task = asyncio.create_task(self._drain(key))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        self._report()
+    
+    async def _drain(self, key: tuple):
+        lane = self.lanes[key]
+        try:
+            while lane:
+                job = lane.popleft()
+                async with self.slots:
+                    self.queued -= 1
+                    self.running += 1
+                    self._report()
+                    try:
+                        await job()
+                    except Exception as e:
+                        logger.error(f"Copy job failed: {e}")
+                    finally:
+                        self.running -= 1
+        finally:
+            del self.lanes[key]
+            self._report()
+    
+    def _report(self):
+        metrics.gauge('copy_queue_depth', self.queued)
+        metrics.gauge('copy_running', self.running)
+        metrics.gauge('copy_lanes', len(self.lanes))
+    
+    async def close(self, timeout: float = 10.0):
+        """Let in-flight copies finish (bounded by timeout), then cancel the rest"""
+        if self.tasks:
+            _, pending = await asyncio.wait(set(self.tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+
+class TradeNetter:
+    """Nets a wallet's fills per token over a short window into one combined trade.
+    
+    Exposure matches copying each fill: a net BUY is sized as its BUY fills' worth of copies, scaled by
+    net/gross shares, so ten BUYs buy ten copies in one order and a BUY mostly undone by a SELL buys little
+    (nothing once below MIN_TRADE_SIZE). A net SELL sells the net shares, as a single SELL fill would.
+    """
+    
+    def __init__(self, window: float, emit):
+        self.window = window
+        self.emit = emit  # (trade, target) -> None
+        self.buckets: Dict[tuple, tuple] = {}
+    
+    def add(self, trade: Trade, target: 'TargetWallet'):
+        key = (target.address, trade.asset_id)
+        if key in self.buckets:
+            self.buckets[key][1].append(trade)
+        else:
+            self.buckets[key] = (target, [trade])
+            asyncio.get_running_loop().call_later(self.window, self._flush, key)
+    
+    def _flush(self, key: tuple):
+        if key not in self.buckets:
+            return
+        target, trades = self.buckets.pop(key)
+        net = self.net(trades)
+        if len(trades) > 1:
+            metrics.incr('netted_fills', len(trades) - 1)
+            result = f"{net.side} {net.size:.2f} @ {net.price:.4f}" if net else "flat"
+            logger.info(f"🧮 Netted {len(trades)} fills on {key[1]} → {result}")
+        if net:
+            self.emit(net, target)
+    
+    @staticmethod
+    def net(trades: List[Trade]) -> Optional[Trade]:
+        if len(trades) == 1:
+            return trades[0]
+        signed = {'BUY': 0.0, 'SELL': 0.0}
+        notional = {'BUY': 0.0, 'SELL': 0.0}
+        for t in trades:
+            if t.side in signed:
+                signed[t.side] += t.size
+                notional[t.side] += t.size * t.price
+        net_size = signed['BUY'] - signed['SELL']
+        if abs(net_size) < 1e-9:
+            return None
+        side = 'BUY' if net_size > 0 else 'SELL'
+        buys = sum(t.fills for t in trades if t.side == 'BUY')
+        return Trade(
+            f"{trades[0].id}+{len(trades) - 1}", trades[0].asset_id, side,
+            # Price at the volume-weighted average of the fills on the surviving side
+            notional[side] / signed[side], abs(net_size), min(t.match_time for t in trades), trades[0].market,
+            fills=buys * net_size / signed['BUY'] if side == 'BUY' else 1.0
+        )
+    
+    def flush_all(self):
+        for key in list(self.buckets):
+            self._flush(key)
+
+
+class Position:
+    __slots__ = ('size', 'avg_price', 'market')
+    
+    def __init__(self, size: float = 0.0, avg_price: float = 0.0, market: str = ''):
+        self.size = size
+        self.avg_price = avg_price
+        self.market = market  # condition id, when /positions reported it
+    
+    def apply(self, side: str, size: float, price: float):
+        if side == 'BUY':
+            new_size = self.size + size
+            self.avg_price = (self.size * self.avg_price + size * price) / new_size if new_size > 0 else price
+            self.size = new_size
+        else:
+            self.size = max(0.0, self.size - size)
+
+
+def size_copy(side: str, trade_size: float, balance: float, position: Position,
+              copy_pct: float, min_trade: float, max_trade: float, fills: float = 1.0) -> float:
+    """Order size for copying a trade, or 0 to skip it; shared by live trading and replay.
+    A netted BUY counts as `fills` copies of one fill (see TradeNetter)."""
+    if side == 'BUY':
+        size = min(max_trade, max(min_trade, balance * copy_pct / 100)) * fills
+        if size < min_trade or balance < size:
+            return 0.0
+        return size
+    if side == 'SELL':
+        if position.size <= 0:
+            return 0.0
+        # Estimate sell percentage (simplified)
+        sell_pct = min(100, (trade_size / position.size) * 100)
+        size = (position.size * sell_pct) / 100
+        return max(0.01, min(size, position.size))
+    return 0.0
+
+
+class PositionStore:
+    """Per-token positions kept current from our own fills, reconciled against the API in the background"""
+    
+    def __init__(self, fetch, on_sync=None):
+        self.fetch = fetch  # async () -> Dict[str, Position] or None on failure
+        self.on_sync = on_sync  # called with the new snapshot after each successful refresh
+        self.positions: Dict[str, Position] = {}
+        self.loaded = False
+        self.last_sync = 0.0
+        self._refresh: Optional[asyncio.Task] = None
+        self._fills_in_flight: List[tuple] = []
+        self._sizes_at_request: Dict[str, float] = {}
+    
+    def get(self, token_id: str) -> Position:
+        return self.positions.get(token_id) or Position()
+    
+    def apply_fill(self, token_id: str, side: str, size: float, price: float) -> Position:
+        """Apply one of our confirmed fills; read-modify-write with no await in between"""
+        if self._refresh and not self._refresh.done():
+            self._fills_in_flight.append((token_id, side, size, price))
+        pos = self.positions.get(token_id)
+        if pos is None:
+            pos = self.positions[token_id] = Position()
+        pos.apply(side, size, price)
+        return pos
+    
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await self.refresh()
+    
+    async def refresh(self):
+        # Single flight: concurrent callers share one in-progress fetch
+        if self._refresh is None or self._refresh.done():
+            self._fills_in_flight = []
+            self._sizes_at_request = {t: p.size for t, p in self.positions.items()}
+            self._refresh = asyncio.create_task(self._do_refresh())
+        await asyncio.shield(self._refresh)
+    
+    async def _do_refresh(self):
+        fetched = await self.fetch()
+        if fetched is None:
+            return
+        fills, self._fills_in_flight = self._fills_in_flight, []
+        self.positions = fetched
+        self.loaded = True
+        self.last_sync = time.time()
+        # Fills confirmed while the snapshot was in flight may or may not be in it yet
+        for fill in self.unseen_fills(fills):
+            self.apply_fill(*fill)
+        self._fills_in_flight = []
+        if self.on_sync:
+            self.on_sync(self.positions)
+    
+    def unseen_fills(self, fills: List[tuple]) -> List[tuple]:
+        """The in-flight fills a new snapshot doesn't contain yet: per token, skip the longest leading run
+        that takes our size when the request went out to the snapshot's size (none if no run does)"""
+        by_token: Dict[str, List[tuple]] = {}
+        for fill in fills:
+            by_token.setdefault(fill[0], []).append(fill)
+        unseen = []
+        for token_id, token_fills in by_token.items():
+            target = self.get(token_id).size
+            pos = Position(self._sizes_at_request.get(token_id, 0.0))
+            seen = 0
+            for i, (_, side, size, price) in enumerate(token_fills, 1):
+                pos.apply(side, size, price)
+                if abs(pos.size - target) <= 1e-6 * max(1.0, target):
+                    seen = i
+            unseen.extend(token_fills[seen:])
+        return unseen
+    
+    async def reconcile_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Position reconcile failed: {e}")
+
+
+class Exposure:
+    """Notional (USDC) held per token, per market and in total, updated by deltas"""
+    __slots__ = ('tokens', 'markets', 'total')
+    
+    def __init__(self):
+        self.tokens: Dict[str, float] = {}
+        self.markets: Dict[str, float] = {}
+        self.total = 0.0
+    
+    def add(self, token_id: str, market: str, delta: float):
+        self.tokens[token_id] = self.tokens.get(token_id, 0.0) + delta
+        self.markets[market] = self.markets.get(market, 0.0) + delta
+        self.total += delta
+
+
+class RiskEngine:
+    """Pre-trade exposure and loss limits for one account, checked in O(1) from incrementally kept aggregates"""
+    
+    def __init__(self, max_token: float = 0, max_market: float = 0, max_total: float = 0, max_daily_loss: float = 0):
+        # 0 disables a limit
+        self.max_token = max_token
+        self.max_market = max_market
+        self.max_total = max_total
+        self.max_daily_loss = max_daily_loss
+        self.held = Exposure()  # cost basis of confirmed positions
+        self.pending = Exposure()  # BUYs admitted but not yet acknowledged
+        self.market_of: Dict[str, str] = {}  # token -> market; a real id replaces the token-only fallback once known
+        self.day = int(time.time() // 86400)  # UTC day number; the loss limit and kill switch reset with it
+        self.realized = 0.0
+        self.halted: Optional[str] = None
+    
+    def market(self, token_id: str, market: str = '') -> str:
+        # Tokens seen only on-chain (no market id yet) count as their own market until one turns up
+        known = self.market_of.get(token_id)
+        if not market or known == market:
+            return known or self.market_of.setdefault(token_id, token_id)
+        if known == token_id:
+            # Move what was booked under the fallback so deltas stay balanced
+            for exposure in (self.held, self.pending):
+                amount = exposure.markets.pop(token_id, 0.0)
+                exposure.markets[market] = exposure.markets.get(market, 0.0) + amount
+        elif known:
+            return known
+        self.market_of[token_id] = market
+        return market
+    
+    def rebuild(self, positions: Dict[str, 'Position']):
+        """Recompute held exposure from a full positions snapshot (startup and reconcile, not per trade)"""
+        self.held = Exposure()
+        for token_id, pos in positions.items():
+            if pos.size:
+                self.held.add(token_id, self.market(token_id, pos.market), pos.size * pos.avg_price)
+    
+    def check(self, token_id: str, market: str, side: str, notional: float) -> Optional[str]:
+        """Reason the order breaches a limit, or None; exits are never blocked since they only cut exposure"""
+        if side != 'BUY':
+            return None
+        self.roll_day()
+        if self.halted:
+            return f"kill switch engaged ({self.halted})"
+        market = self.market(token_id, market)
+        held, pending = self.held, self.pending
+        if self.max_token and held.tokens.get(token_id, 0.0) + pending.tokens.get(token_id, 0.0) + notional > self.max_token:
+            return f"token exposure would exceed ${self.max_token:g}"
+        if self.max_market and held.markets.get(market, 0.0) + pending.markets.get(market, 0.0) + notional > self.max_market:
+            return f"market exposure would exceed ${self.max_market:g}"
+        if self.max_total and held.total + pending.total + notional > self.max_total:
+            return f"total exposure would exceed ${self.max_total:g}"
+        return None
+    
+    def reserve(self, token_id: str, notional: float):
+        if notional:
+            self.pending.add(token_id, self.market(token_id), notional)
+    
+    def release(self, token_id: str, notional: float):
+        if notional:
+            self.pending.add(token_id, self.market(token_id), -notional)
+    
+    def on_fill(self, token_id: str, side: str, size: float, price: float, avg_price: float) -> float:
+        """Book one of our fills (avg_price is the position's cost before it); returns realized P&L"""
+        market = self.market(token_id)
+        if side == 'BUY':
+            self.held.add(token_id, market, size * price)
+            return 0.0
+        self.held.add(token_id, market, -size * avg_price)
+        pnl = (price - avg_price) * size if avg_price > 0 else 0.0
+        self.record_pnl(pnl)
+        return pnl
+    
+    def roll_day(self):
+        today = int(time.time() // 86400)
+        if today != self.day:
+            self.day, self.realized, self.halted = today, 0.0, None
+    
+    def record_pnl(self, pnl: float):
+        self.roll_day()
+        self.realized += pnl
+        if self.max_daily_loss and -self.realized >= self.max_daily_loss and not self.halted:
+            self.halt(f"daily realized loss ${-self.realized:.2f} ≥ ${self.max_daily_loss:g}")
+    
+    def halt(self, reason: str):
+        """Latch the kill switch: no new BUYs for the rest of the UTC day, across restarts"""
+        self.halted = reason
+        metrics.incr('risk_halts')
+        logger.error(f"🛑 KILL SWITCH: {reason}")
+    
+    def snapshot(self) -> dict:
+        return {'day': self.day, 'realized': self.realized, 'halted': self.halted}
+    
+    def restore(self, saved: dict):
+        self.market_of.update(saved.get('markets', {}))
+        if saved.get('day') == self.day:
+            self.realized = saved.get('realized', 0.0)
+            self.halted = saved.get('halted')
+
+
+class StateStore:
+    """Append-only SQLite (WAL) log of agent state with periodic snapshots, written off the hot path"""
+    
+    def __init__(self, path: str, flush_interval: float = 0.5, compact_every: int = 5000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.pending: List[tuple] = []
+        self.since_snapshot = 0
+        self.snapshot_fn = None
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, payload TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS snapshot (id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER, state TEXT)")
+        self.db.commit()
+        # All DB access after startup happens on this one thread
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state')
+        self._task: Optional[asyncio.Task] = None
+    
+    def load(self) -> dict:
+        """Snapshot plus replayed log: processed ids, per-account positions and counters, no network needed"""
+        state = {'processed': [], 'positions': {}, 'total_trades': 0, 'successful': 0, 'synced': [], 'risk': {}}
+        seq = 0
+        row = self.db.execute("SELECT seq, state FROM snapshot WHERE id = 1").fetchone()
+        if row:
+            seq, saved = row[0], json.loads(row[1])
+            state.update(saved)
+        processed = OrderedDict.fromkeys(state['processed'])
+        positions = {
+            address: {t: Position(*v) for t, v in held.items()}
+            for address, held in state['positions'].items()
+        }
+        synced = set(state['synced'])
+        
+        rows = self.db.execute("SELECT kind, payload FROM events WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+        for kind, payload in rows:
+            data = json.loads(payload)
+            if kind == 'trade':
+                processed[data] = None
+                state['total_trades'] += 1
+            elif kind == 'fill':
+                address, token_id, side, size, price = data
+                positions.setdefault(address, {}).setdefault(token_id, Position()).apply(side, size, price)
+                state['successful'] += 1
+            elif kind == 'positions':
+                positions[data['address']] = {t: Position(*v) for t, v in data['positions'].items()}
+                synced.add(data['address'])
+            elif kind == 'risk':
+                state['risk'].setdefault(data.pop('address'), {}).update(data)
+        self.since_snapshot = len(rows)
+        
+        state['processed'] = list(processed)
+        state['positions'] = positions
+        state['synced'] = synced
+        return state
+    
+    def append(self, kind: str, payload):
+        self.pending.append((kind, json.dumps(payload)))
+    
+    def start(self, snapshot_fn):
+        """snapshot_fn() returns the full state to compact into; called on the event loop"""
+        self.snapshot_fn = snapshot_fn
+        if not self._task:
+            self._task = asyncio.create_task(self._flush_forever())
+    
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                metrics.error('state')
+                logger.warning(f"State flush failed: {e}")
+    
+    async def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        self.since_snapshot += len(batch)
+        # Capture the snapshot with no await after taking the batch, so it covers exactly these events
+        snapshot = None
+        if self.snapshot_fn and self.since_snapshot >= self.compact_every:
+            snapshot = json.dumps(self.snapshot_fn())
+            self.since_snapshot = 0
+        with metrics.time('state_flush'):
+            await asyncio.get_running_loop().run_in_executor(self.writer, self._write, batch, snapshot)
+    
+    def _write(self, batch: List[tuple], snapshot: Optional[str]):
+        with self.db:
+            self.db.executemany("INSERT INTO events (kind, payload) VALUES (?, ?)", batch)
+            if snapshot is not None:
+                seq = self.db.execute("SELECT MAX(seq) FROM events").fetchone()[0]
+                self.db.execute("INSERT OR REPLACE INTO snapshot (id, seq, state) VALUES (1, ?, ?)", (seq, snapshot))
+                self.db.execute("DELETE FROM events WHERE seq <= ?", (seq,))
+    
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        self.writer.shutdown(wait=True)
+        self.db.close()
+
+
+class ReplayEngine:
+    """Runs recorded target trades through the live sizing and position code with simulated fills"""
+    
+    def __init__(self, trades: List[tuple], balance: float = 1000.0, slippage_bps: float = 50.0):
+        self.trades = trades
+        self.balance = balance
+        self.slippage = slippage_bps / 10000
+    
+    @staticmethod
+    def load(path: str) -> List[tuple]:
+        """Recorded trades (JSONL, or Parquet with pyarrow) as compact (ts, asset_id, side, price, size) tuples"""
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            rows = pq.read_table(path).to_pylist()
+        else:
+            with open(path, 'rb') as f:
+                rows = [json_loads(line) for line in f if line.strip()]
+        trades = [
+            (trade_timestamp(r), str(r.get('asset_id')), str(r.get('side', 'BUY')).upper(),
+             float(r.get('price', 0.5)), float(r.get('size', 0)))
+            for r in rows
+        ]
+        trades.sort(key=lambda t: t[0])
+        return trades
+    
+    def run(self, copy_pct: float, min_trade: float, max_trade: float) -> dict:
+        cash = self.balance
+        positions: Dict[str, Position] = {}
+        last_price: Dict[str, float] = {}
+        copied = skipped = wins = sells = 0
+        realized = slippage_cost = 0.0
+        flat = Position()
+        slip = self.slippage
+        
+        for _, token_id, side, price, trade_size in self.trades:
+            last_price[token_id] = price
+            pos = positions.get(token_id, flat)
+            size = size_copy(side, trade_size, cash, pos, copy_pct, min_trade, max_trade)
+            if not size:
+                skipped += 1
+                continue
+            
+            # Fill model: the target's price moved against us by the slippage bound
+            if side == 'BUY':
+                fill = min(0.999, price * (1 + slip))
+                if size * fill > cash:
+                    skipped += 1
+                    continue
+                cash -= size * fill
+                if pos is flat:
+                    pos = positions[token_id] = Position()
+            else:
+                fill = max(0.001, price * (1 - slip))
+                cash += size * fill
+                pnl = (fill - pos.avg_price) * size
+                realized += pnl
+                sells += 1
+                wins += pnl > 0
+            slippage_cost += abs(fill - price) * size
+            pos.apply(side, size, fill)
+            copied += 1
+        
+        unrealized = sum((last_price[t] - p.avg_price) * p.size for t, p in positions.items() if p.size)
+        equity = cash + sum(last_price[t] * p.size for t, p in positions.items())
+        return {
+            'copy_pct': copy_pct, 'min_trade': min_trade, 'max_trade': max_trade,
+            'copied': copied, 'skipped': skipped,
+            'realized_pnl': realized, 'unrealized_pnl': unrealized,
+            'pnl': equity - self.balance,
+            'slippage': slippage_cost,
+            'hit_rate': wins / sells if sells else 0.0,
+        }
+
+
+_replay_engine: Optional[ReplayEngine] = None
+
+
+def _replay_init(path: str, balance: float, slippage_bps: float):
+    global _replay_engine
+    _replay_engine = ReplayEngine(ReplayEngine.load(path), balance, slippage_bps)
+
+
+def _replay_run(params: dict) -> dict:
+    return _replay_engine.run(**params)
+
+
+def run_sweep(path: str, grid: List[dict], balance: float = 1000.0, slippage_bps: float = 50.0, workers: int = 0) -> List[dict]:
+    """Replay every parameter set in grid, spread across a process pool"""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    # Parse the recording once; forked workers inherit it, spawned ones re-read it
+    _replay_init(path, balance, slippage_bps)
+    if len(grid) == 1 or workers == 1:
+        return [_replay_run(p) for p in grid]
+    if multiprocessing.get_start_method() == 'fork':
+        pool = ProcessPoolExecutor(max_workers=workers or None)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers or None, initializer=_replay_init,
+                                   initargs=(path, balance, slippage_bps))
+    with pool:
+        return list(pool.map(_replay_run, grid))
+
+
+class Notifier:
+    """Background Telegram dispatcher: bounded queue, per-chat rate limit, burst digests, retries"""
+    
+    MAX_LENGTH = 4096
+    
+    def __init__(self, bot, chat_id: str, queue_size: int = 200, min_interval: float = 1.0,
+                 batch_window: float = 2.0, retries: int = 3):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.min_interval = min_interval
+        self.batch_window = batch_window
+        self.retries = retries
+        self.last_sent = 0.0
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._dispatch())
+    
+    def notify(self, msg: str):
+        """Queue a message without waiting; drops it if the queue is full"""
+        try:
+            self.queue.put_nowait(msg.strip())
+        except asyncio.QueueFull:
+            metrics.incr('telegram_dropped')
+            logger.warning("Telegram queue full, dropping notification")
+    
+    async def _dispatch(self):
+        while True:
+            batch = [await self.queue.get()]
+            # Collect whatever else arrives in the window so a burst becomes one digest
+            deadline = time.monotonic() + self.batch_window
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            for text in self._digest(batch):
+                await self._send(text)
+            for _ in batch:
+                self.queue.task_done()
+    
+    def _digest(self, batch: List[str]) -> List[str]:
+        if len(batch) == 1:
+            return [batch[0][:self.MAX_LENGTH]]
+        header = f"📦 <b>{len(batch)} UPDATES</b>"
+        texts, current = [], header
+        for msg in batch:
+            part = f"\n\n{msg}"
+            if len(current) + len(part) > self.MAX_LENGTH:
+                texts.append(current)
+                current = msg[:self.MAX_LENGTH]
+            else:
+                current += part
+        texts.append(current)
+        return texts
+    
+    async def _send(self, text: str):
+        from telegram.error import RetryAfter
+        for attempt in range(self.retries + 1):
+            wait = self.last_sent + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                with metrics.time('telegram'):
+                    await self.bot.send_message(chat_id=self.chat_id, text=text, parse_mode='HTML')
+                self.last_sent = time.monotonic()
+                return
+            except RetryAfter as e:
+                delay = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else float(e.retry_after)
+            except Exception as e:
+                delay = 2 ** attempt
+                logger.debug(f"Telegram send failed: {e}")
+            self.last_sent = time.monotonic()
+            if attempt < self.retries:
+                await asyncio.sleep(delay)
+        logger.warning(f"Telegram notification dropped after {self.retries + 1} attempts")
+    
+    async def close(self, timeout: float = 5.0):
+        """Flush queued messages (bounded by timeout), then stop the dispatcher"""
+        if self._task:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._task.cancel()
+            self._task = None
+
+
+class OrderBook:
+    """L2 book for one token; price levels kept in sorted lists so walking depth needs no sort"""
+    
+    __slots__ = ('bids', 'asks', 'bid_prices', 'ask_prices', 'updated')
+    
+    def __init__(self):
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.bid_prices: List[float] = []  # ascending
+        self.ask_prices: List[float] = []  # ascending
+        self.updated = 0.0
+    
+    def load(self, bids: List[dict], asks: List[dict]):
+        self.bids = {float(l['price']): float(l['size']) for l in bids if float(l['size']) > 0}
+        self.asks = {float(l['price']): float(l['size']) for l in asks if float(l['size']) > 0}
+        self.bid_prices = sorted(self.bids)
+        self.ask_prices = sorted(self.asks)
+        self.updated = time.time()
+    
+    def set_level(self, side: str, price: float, size: float):
+        levels, prices = (self.bids, self.bid_prices) if side == 'BUY' else (self.asks, self.ask_prices)
+        if size > 0:
+            if price not in levels:
+                bisect.insort(prices, price)
+            levels[price] = size
+        elif price in levels:
+            del levels[price]
+            del prices[bisect.bisect_left(prices, price)]
+        self.updated = time.time()
+    
+    def sweep_price(self, side: str, size: float) -> Optional[float]:
+        """Worst price needed to fill size against resting liquidity (deepest level if the book is thin)"""
+        if side == 'BUY':
+            levels, prices = self.asks, self.ask_prices
+        else:
+            levels, prices = self.bids, reversed(self.bid_prices)
+        filled, price = 0.0, None
+        for price in prices:
+            filled += levels[price]
+            if filled >= size:
+                break
+        return price
+
+
+class BookCache:
+    """Local L2 books for followed tokens: one REST snapshot each, then market WebSocket deltas"""
+    
+    def __init__(self, ws_url: str, clob_host: str, get_session, max_slippage: float = 0.02, max_age: float = 60.0):
+        self.ws_url = ws_url
+        self.clob_host = clob_host
+        self.get_session = get_session
+        self.max_slippage = max_slippage
+        self.max_age = max_age
+        self.books: Dict[str, OrderBook] = {}
+        self.snapshots: Dict[str, asyncio.Task] = {}
+        self.ws = None
+    
+    def track(self, token_id: str):
+        if not token_id or token_id in self.books:
+            return
+        self.books[token_id] = OrderBook()
+        self.snapshots[token_id] = asyncio.create_task(self.fetch_snapshot(token_id))
+        if self.ws is not None and not self.ws.closed:
+            asyncio.create_task(self.ws.send_json({'assets_ids': [token_id], 'operation': 'subscribe'}))
+    
+    async def ensure(self, token_id: str, timeout: float = 1.0):
+        """Wait (briefly) for a token's first snapshot if it is still loading"""
+        self.track(token_id)
+        task = self.snapshots.get(token_id)
+        if task and not task.done():
+            await asyncio.wait([task], timeout=timeout)
+    
+    async def fetch_snapshot(self, token_id: str):
+        try:
+            url = f"{self.clob_host}/book"
+            with metrics.time('book_snapshot'):
+                async with self.get_session().get(url, params={'token_id': token_id}, timeout=aiohttp.ClientTimeout(total=5)) as r:
+                    if r.status != 200:
+                        metrics.error('book_snapshot')
+                        return
+                    book = await r.json()
+            self.books[token_id].load(book.get('bids') or [], book.get('asks') or [])
+        except Exception as e:
+            logger.debug(f"Book snapshot failed for {token_id}: {e}")
+    
+    def limit_price(self, token_id: str, side: str, size: float, ref_price: float) -> float:
+        """Price that crosses enough depth for size, bounded to max_slippage from ref_price"""
+        book = self.books.get(token_id)
+        if not book or time.time() - book.updated > self.max_age:
+            return ref_price
+        price = book.sweep_price(side, size)
+        if price is None:
+            return ref_price
+        if side == 'BUY':
+            return min(price, ref_price * (1 + self.max_slippage), 0.999)
+        return max(price, ref_price * (1 - self.max_slippage), 0.001)
+    
+    def apply(self, event: dict):
+        kind = event.get('event_type')
+        if kind == 'book':
+            book = self.books.get(event.get('asset_id'))
+            if book:
+                book.load(event.get('bids') or event.get('buys') or [], event.get('asks') or event.get('sells') or [])
+        elif kind == 'price_change':
+            for change in event.get('price_changes') or event.get('changes') or []:
+                book = self.books.get(change.get('asset_id') or event.get('asset_id'))
+                if book:
+                    book.set_level(change['side'].upper(), float(change['price']), float(change['size']))
+    
+    async def run(self):
+        backoff = 1
+        while True:
+            try:
+                async with self.get_session().ws_connect(self.ws_url, heartbeat=30) as ws:
+                    self.ws = ws
+                    await ws.send_json({'assets_ids': list(self.books), 'type': 'market'})
+                    backoff = 1
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            break
+                        if not msg.data.startswith(('{', '[')):
+                            continue
+                        data = json_loads(msg.data)
+                        for event in data if isinstance(data, list) else [data]:
+                            self.apply(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Book stream error: {e}")
+            self.ws = None
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+
+class FollowerAccount:
+    """One of our wallets copying the shared signal: its own key, client, sizing, positions and order queue"""
+    
+    def __init__(self, agent: 'CopyTradingAgent', entry: dict, sizing: bool = True):
+        self.address = entry['MY_ADDRESS']
+        self.private_key = entry['PRIVATE_KEY']
+        self.creds = None
+        if entry.get('CLOB_API_KEY'):
+            self.creds = (entry['CLOB_API_KEY'], entry['CLOB_API_SECRET'], entry['CLOB_API_PASSPHRASE'])
+        self.client = None  # built by connect(), off the startup path
+        # Per-account sizing overrides; None falls back to the copied wallet's settings
+        self.copy_pct = float(entry['COPY_PERCENTAGE']) if sizing and 'COPY_PERCENTAGE' in entry else None
+        self.min_trade = float(entry['MIN_TRADE_SIZE']) if sizing and 'MIN_TRADE_SIZE' in entry else None
+        self.max_trade = float(entry['MAX_TRADE_SIZE']) if sizing and 'MAX_TRADE_SIZE' in entry else None
+        self.orders = OrderExecutor(
+            None, agent.get_session,
+            workers=int(agent.config.get('ORDER_WORKERS', 4)),
+            queue_size=int(agent.config.get('ORDER_QUEUE_SIZE', 100)),
+            sign_pool=agent.sign_pool
+        )
+        self.positions = PositionStore(
+            lambda: agent.fetch_positions(self.address),
+            lambda positions: agent.on_positions_synced(self, positions)
+        )
+        self.reserved_balance = 0.0  # USDC committed to BUYs still being submitted
+        self.successful = 0
+        limit = lambda key: float(entry.get(key, agent.config.get(key, 0)))
+        self.risk = RiskEngine(
+            max_token=limit('MAX_TOKEN_EXPOSURE'),
+            max_market=limit('MAX_MARKET_EXPOSURE'),
+            max_total=limit('MAX_TOTAL_EXPOSURE'),
+            max_daily_loss=limit('MAX_DAILY_LOSS')
+        )
+    
+    @property
+    def short(self) -> str:
+        return f"{self.address[:6]}...{self.address[-4:]}"
+    
+    def connect(self, clob_host: str):
+        """Import the CLOB SDK and build this account's client; blocking, so run it off the event loop"""
+        from py_clob_client.client import ClobClient
+        from py_clob_client.clob_types import ApiCreds
+        creds = ApiCreds(*self.creds) if self.creds else None
+        self.client = self.orders.client = ClobClient(clob_host, key=self.private_key, chain_id=137, creds=creds)
+    
+    def sizing(self, target: 'TargetWallet') -> tuple:
+        return (
+            target.copy_pct if self.copy_pct is None else self.copy_pct,
+            target.min_trade if self.min_trade is None else self.min_trade,
+            target.max_trade if self.max_trade is None else self.max_trade,
+        )
+
+
+def trade_timestamp(trade: Dict) -> float:
+    try:
+        return float(trade.get('match_time') or trade.get('timestamp') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
 class CopyTradingAgent:
     """Main copy trading bot"""
     
@@ -303,7 +1921,6 @@ class CopyTradingAgent:
         self.config = config
         self.my_address = config['MY_ADDRESS']
         self.private_key = config['PRIVATE_KEY']
-        self.target_wallet = config['WALLET_TO_COPY']
         self.rpc_url = config['POLYGON_RPC']
         self.copy_pct = config['COPY_PERCENTAGE']
         self.min_trade = config['MIN_TRADE_SIZE']
@@ -312,141 +1929,390 @@ class CopyTradingAgent:
         self.tg_token = config.get('TELEGRAM_BOT_TOKEN', '')
         self.tg_chat = config.get('TELEGRAM_CHAT_ID', '')
         
+        # Followed wallets (TARGETS list, or the single WALLET_TO_COPY)
+        entries = config.get('TARGETS') or [config['WALLET_TO_COPY']]
+        self.targets: List[TargetWallet] = [TargetWallet.from_config(e, config) for e in entries]
+        self.target_wallet = self.targets[0].address
+        self.max_concurrent_polls = int(config.get('MAX_CONCURRENT_POLLS', 10))
+        self.poll_slots = asyncio.Semaphore(self.max_concurrent_polls)
+        self.page_size = int(config.get('TRADE_PAGE_SIZE', 50))
+        self.max_pages = int(config.get('MAX_TRADE_PAGES', 10))
+        self.min_poll = float(config.get('MIN_POLL_INTERVAL', self.interval / 2))
+        self.max_poll = float(config.get('MAX_POLL_INTERVAL', self.interval * 5))
+        self.poll_backoff = float(config.get('POLL_BACKOFF', 1.5))
+        self.poll_jitter = float(config.get('POLL_JITTER', 0.1))
+        self.throttled_until = 0.0
+        self.started_at = time.time()
+        for target in self.targets:
+            target.delay = self.interval
+        self.recorder = open(config['RECORD_FILE'], 'a', buffering=1) if config.get('RECORD_FILE') else None
+        self.stream = None
+        if config.get('STREAM_URL'):
+            self.stream = TradeStream(config['STREAM_URL'], self.targets, self.ingest, self.get_session,
+                                      rpc_url=self.rpc_url, on_connect=self.catch_up)
+        
         # Initialize
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
-        self.client = ClobClient("https://clob.polymarket.com", key=self.private_key, chain_id=137)
-        self.telegram = Bot(token=self.tg_token) if self.tg_token else None
+        self.http = HttpPool(
+            size=int(config.get('HTTP_POOL_SIZE', 100)),
+            per_host=int(config.get('HTTP_POOL_PER_HOST', 20)),
+            keepalive=float(config.get('HTTP_KEEPALIVE', 60)),
+            dns_ttl=int(config.get('DNS_CACHE_TTL', 300)),
+            http2=bool(config.get('HTTP2', True))
+        )
+        self.balances = BalanceReader(self.rpc_url, float(config.get('BALANCE_COALESCE_MS', 25)) / 1000)
+        self.clob_host = config.get('CLOB_HOST', 'https://clob.polymarket.com')
+        
+        # Our accounts: the top-level wallet plus any FOLLOWERS, all fed by the one ingestion pipeline
+        follower_entries = config.get('FOLLOWERS', [])
+        self.sign_pool = None
+        signing_processes = int(config.get('SIGNING_PROCESSES', 0))
+        if signing_processes > 0:
+            from concurrent.futures import ProcessPoolExecutor
+            keys = [self.private_key] + [e['PRIVATE_KEY'] for e in follower_entries]
+            self.sign_pool = ProcessPoolExecutor(signing_processes, initializer=_signer_init, initargs=(keys, 137))
+        self.followers: List[FollowerAccount] = [FollowerAccount(self, config, sizing=False)]
+        self.followers += [FollowerAccount(self, entry) for entry in follower_entries]
+        primary = self.followers[0]
+        self.orders = primary.orders
+        self.positions = primary.positions
+        self.ready = asyncio.Event()  # set once the execution stack (SDKs, clients) is built
+        self.telegram = None
+        if self.tg_token:
+            from telegram import Bot
+            self.telegram = Bot(token=self.tg_token)
+        self.notifier = None
+        if self.telegram and self.tg_chat:
+            self.notifier = Notifier(
+                self.telegram, self.tg_chat,
+                min_interval=float(config.get('TELEGRAM_MIN_INTERVAL', 1.0)),
+                batch_window=float(config.get('TELEGRAM_BATCH_WINDOW', 2.0))
+            )
         
         # Tracking
-        self.processed: Set[str] = set()
+        self.processed = DedupIndex(int(config.get('DEDUP_CAPACITY', 5000)), config.get('DEDUP_FILE', ''))
         self.total_trades = 0
         self.successful = 0
-        self.session = None
-        self.my_positions = {}
-        self.position_cache_time = 0
+        self.scheduler = TradeScheduler(int(config.get('MAX_CONCURRENT_COPIES', 8)))
+        self.books = None
+        if config.get('PRICING_MODE', 'target') == 'book':
+            self.books = BookCache(
+                config.get('BOOK_WS_URL', 'wss://ws-subscriptions-clob.polymarket.com/ws/market'),
+                self.clob_host, self.get_session,
+                max_slippage=float(config.get('MAX_SLIPPAGE_PCT', 2)) / 100
+            )
+        netting_window = float(config.get('NETTING_WINDOW_MS', 0)) / 1000
+        self.netter = TradeNetter(netting_window, self.schedule_copy) if netting_window > 0 else None
+        self.reconcile_interval = float(config.get('POSITION_RECONCILE_INTERVAL', 60))
+        self.metrics_port = int(config.get('METRICS_PORT', 0))
+        self.metrics_log_interval = float(config.get('METRICS_LOG_INTERVAL', 300))
+        self.tasks: List[asyncio.Task] = []
+        self.metrics_runner = None
+        self.diagnostics = None
+        if config.get('DIAGNOSTICS'):
+            self.diagnostics = Diagnostics(
+                block_threshold=float(config.get('BLOCK_THRESHOLD_MS', 100)) / 1000,
+                sample_interval=float(config.get('PROFILE_INTERVAL_MS', 5)) / 1000,
+                profile_dir=config.get('PROFILE_DIR', '.')
+            )
+        
+        # Warm start from the local state store. Cursors are not persisted: each wallet's first poll
+        # re-seeds from the agent's start time (seed_cursor), so fills made while we were down are skipped
+        self.state = None
+        if config.get('STATE_DB'):
+            self.state = StateStore(config['STATE_DB'], float(config.get('STATE_FLUSH_INTERVAL', 0.5)))
+            saved = self.state.load()
+            self.processed.restore(saved['processed'])
+            for follower in self.followers:
+                follower.positions.positions = saved['positions'].get(follower.address, {})
+                follower.positions.loaded = follower.address in saved['synced']
+                follower.risk.restore(saved['risk'].get(follower.address, {}))
+                follower.risk.rebuild(follower.positions.positions)
+            self.total_trades = saved['total_trades']
+            self.successful = saved['successful']
+            held = sum(len(f.positions.positions) for f in self.followers)
+            logger.info(f"State restored: {len(self.processed)} trade ids, {held} positions (fills while offline are not copied)")
         
         logger.info("Agent initialized")
     
-    async def send_tg(self, msg: str):
-        if self.telegram and self.tg_chat:
-            try:
-                await self.telegram.send_message(chat_id=self.tg_chat, text=msg, parse_mode='HTML')
-            except:
-                pass
+    def snapshot_state(self) -> dict:
+        return {
+            'processed': list(self.processed),
+            'positions': {
+                f.address: {t: [p.size, p.avg_price, p.market] for t, p in f.positions.positions.items() if p.size}
+                for f in self.followers
+            },
+            'total_trades': self.total_trades,
+            'successful': self.successful,
+            'synced': [f.address for f in self.followers if f.positions.loaded],
+            'risk': {f.address: {**f.risk.snapshot(), 'markets': f.risk.market_of} for f in self.followers},
+        }
+    
+    def on_positions_synced(self, follower: FollowerAccount, positions: Dict[str, Position]):
+        follower.risk.rebuild(positions)
+        if self.state:
+            held = {t: [p.size, p.avg_price, p.market] for t, p in positions.items()}
+            self.state.append('positions', {'address': follower.address, 'positions': held})
     
-    async def get_balance(self) -> float:
+    def send_tg(self, msg: str):
+        if self.notifier:
+            self.notifier.notify(msg)
+    
+    async def get_balance(self, address: Optional[str] = None) -> float:
         try:
-            usdc = Web3.to_checksum_address("0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174")
-            abi = [{"constant":True,"inputs":[{"name":"_owner","type":"address"}],"name":"balanceOf","outputs":[{"name":"balance","type":"uint256"}],"type":"function"}]
-            contract = self.w3.eth.contract(address=usdc, abi=abi)
-            bal = contract.functions.balanceOf(self.my_address).call()
-            return bal / 10**6
-        except:
+            with metrics.time('balance'):
+                return await self.balances.get(address or self.my_address)
+        except Exception as e:
+            logger.debug(f"Balance read failed: {e}")
             return 0.0
     
-    async def update_my_positions(self):
-        if time.time() - self.position_cache_time < 30:
-            return self.my_positions
+    def get_session(self) -> aiohttp.ClientSession:
+        # One pool shared by polling, order posts, streams and web3
+        return self.http.session()
+    
+    @property
+    def client(self):
+        return self.followers[0].client
+    
+    def connect(self):
+        """Blocking part of startup: import the SDKs and build the web3 and CLOB clients"""
+        self.http.tune_sdk()
+        self.balances.connect()
+        for follower in self.followers:
+            follower.connect(self.clob_host)
+    
+    async def warm_up(self):
+        """Build the execution stack while polling is already running, then pre-open connections"""
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.connect)
+        await self.http.attach_web3(self.balances.w3)
+        self.ready.set()
+        logger.info(f"Execution ready in {time.perf_counter() - started:.2f}s")
         
+        warm = [self.http.warm([self.clob_host])]
+        for follower in self.followers:
+            warm.append(self.get_balance(follower.address))
+        # The SDK's httpx client (tick size / fee lookups when signing)
+        warm.append(loop.run_in_executor(self.orders.pool, self.client.get_ok))
+        if self.sign_pool:
+            # Start the signing processes before the first trade needs them
+            warm += [loop.run_in_executor(self.sign_pool, os.getpid) for _ in range(self.sign_pool._max_workers)]
+        await asyncio.gather(*warm, return_exceptions=True)
+        
+        balance = await self.get_balance()
+        self.send_tg(f"""
+🤖 <b>BOT STARTED!</b>
+
+💰 Balance: ${balance:.2f}
+👤 Copying: {self.targets[0].short}{f" (+{len(self.targets) - 1} more)" if len(self.targets) > 1 else ""}
+👥 Accounts: {len(self.followers)}
+📊 Copy %: {self.copy_pct}%
+
+🚀 Monitoring active!
+        """)
+    
+    async def fetch_positions(self, address: str) -> Optional[Dict[str, Position]]:
+        try:
+            url = f"{self.clob_host}/positions?user={address}"
+            with metrics.time('positions'):
+                async with self.get_session().get(url, timeout=aiohttp.ClientTimeout(total=5)) as r:
+                    if r.status != 200:
+                        metrics.error('positions')
+                        return None
+                    body = await r.read()
+            result = {}
+            for pos in json_loads(body):
+                token_id = pos.get('asset_id')
+                if token_id:
+                    market = pos.get('market') or pos.get('conditionId') or ''
+                    result[token_id] = Position(float(pos.get('size', 0)), float(pos.get('average_price', 0)), market)
+            return result
+        except Exception as e:
+            logger.debug(f"Position fetch failed: {e}")
+        return None
+    
+    async def fetch_trade_page(self, params: dict) -> tuple:
+        """One page of /trades (newest first) and the cursor for the next older page; (None, None) if the request failed"""
+        url = f"{self.clob_host}/trades"
+        try:
+            with metrics.time('fetch_trades'):
+                async with self.get_session().get(url, params=params, timeout=aiohttp.ClientTimeout(total=5)) as r:
+                    if r.status == 429:
+                        metrics.incr('rate_limited')
+                        self.throttle(r.headers.get('Retry-After') or 5)
+                        return None, None
+                    if r.status != 200:
+                        metrics.error('fetch_trades')
+                        return None, None
+                    if r.headers.get('X-RateLimit-Remaining') == '0':
+                        self.throttle(r.headers.get('X-RateLimit-Reset') or 1)
+                    body = await r.read()
+            with metrics.time('parse'):
+                return decode_trade_page(body)
+        except Exception as e:
+            logger.debug(f"Trade fetch failed: {e}")
+        return None, None
+    
+    def throttle(self, value):
+        """Pause all polling for a Retry-After / rate-limit reset value (seconds or epoch time)"""
         try:
-            url = f"https://clob.polymarket.com/positions?user={self.my_address}"
-            if not self.session:
-                self.session = aiohttp.ClientSession()
+            seconds = float(value)
+        except (TypeError, ValueError):
+            seconds = 5.0
+        if seconds > 1e9:
+            seconds -= time.time()
+        self.throttled_until = max(self.throttled_until, time.monotonic() + max(0.0, seconds))
+        logger.warning(f"Rate limited, pausing polls for {seconds:.1f}s")
+    
+    async def fetch_trades(self, target: TargetWallet) -> List[Trade]:
+        """Trades newer than the wallet's cursor, oldest first"""
+        params = {'maker': target.address, 'limit': self.page_size}
+        if not target.cursor:
+            return await self.seed_cursor(target, params)
+        # after is exclusive and the API has whole-second times: ask from the second before the cursor
+        # so fills sharing the cursor's second aren't lost; is_new drops the repeats
+        params['after'] = int(target.cursor) - 1
+        
+        new_trades, ids = [], set()
+        reached_cursor = False
+        for _ in range(self.max_pages):
+            page, next_cursor = await self.fetch_trade_page(params)
+            if page is None:
+                break
+            reached_cursor = any(not target.is_new(t) for t in page)
+            fresh = [t for t in page if target.is_new(t) and t.id not in ids]
+            new_trades.extend(fresh)
+            ids.update(t.id for t in fresh)
             
-            async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as r:
-                if r.status == 200:
-                    positions = await r.json()
-                    result = {}
-                    for pos in positions:
-                        token_id = pos.get('asset_id')
-                        if token_id:
-                            result[token_id] = {
-                                'size': float(pos.get('size', 0)),
-                                'avg_price': float(pos.get('average_price', 0))
-                            }
-                    self.my_positions = result
-                    self.position_cache_time = time.time()
-        except:
-            pass
+            # Stop once we reach already-seen trades
+            if reached_cursor or len(page) < self.page_size:
+                reached_cursor = True
+                break
+            if next_cursor:
+                params['next_cursor'] = next_cursor
+            else:
+                # Offset within the fixed after-window: a burst inside one second can't return the same page
+                # twice, and fills arriving meanwhile only shift rows we then see again (deduped by id)
+                params['offset'] = params.get('offset', 0) + len(page)
+        
+        if page is None:
+            # Copying the newer pages would move the cursor over the unfetched gap; the next poll starts over
+            if new_trades:
+                logger.warning(f"Trade fetch for {target.short} failed mid-burst, retrying from the cursor")
+            return []
+        if not reached_cursor:
+            logger.warning(f"Trade burst exceeded {self.max_pages} pages for {target.short}; older fills skipped")
         
-        return self.my_positions
+        new_trades.sort(key=lambda t: t.match_time)
+        target.advance(new_trades)
+        return new_trades
     
-    async def fetch_trades(self) -> List[Dict]:
-        url = f"https://clob.polymarket.com/trades?maker={self.target_wallet}&limit=10"
-        try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
-            async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as r:
-                if r.status == 200:
-                    return await r.json()
-        except:
-            pass
-        return []
+    async def seed_cursor(self, target: TargetWallet, params: dict) -> List[Trade]:
+        """First poll of a wallet (including after a restart): history from before startup only sets the cursor"""
+        page, _ = await self.fetch_trade_page(params)
+        if page is None:
+            return []
+        target.advance([t for t in page if t.match_time < self.started_at])
+        target.cursor = target.cursor or self.started_at
+        # Fills since startup that landed before this first poll are still copied
+        fresh = sorted((t for t in page if target.is_new(t)), key=lambda t: t.match_time)
+        target.advance(fresh)
+        return fresh
     
-    async def copy_trade(self, trade: Dict):
+    async def copy_trade(self, trade: Trade, target: TargetWallet, follower: Optional[FollowerAccount] = None):
+        follower = follower or self.followers[0]
         try:
-            token_id = trade.get('asset_id')
-            side = trade.get('side', 'BUY').upper()
-            price = float(trade.get('price', 0.5))
-            trade_size = float(trade.get('size', 0))
+            await self.ready.wait()
+            token_id = trade.asset_id
+            side = trade.side
+            price = trade.price
+            trade_size = trade.size
+            
+            await follower.positions.ensure_loaded()
+            if self.books:
+                await self.books.ensure(token_id)
+            my_position = follower.positions.get(token_id)
+            my_size = my_position.size
+            balance = await self.get_balance(follower.address)
             
-            await self.update_my_positions()
-            my_position = self.my_positions.get(token_id, {'size': 0, 'avg_price': 0})
-            my_size = my_position['size']
-            balance = await self.get_balance()
+            # Concurrent BUYs on other tokens haven't hit the chain yet; don't spend their USDC twice
+            available = balance - follower.reserved_balance
+            size = size_copy(side, trade_size, available, my_position, *follower.sizing(target), trade.fills)
+            if size and self.books:
+                # Price off current depth instead of the target's (possibly stale) fill price
+                price = self.books.limit_price(token_id, side, size, price)
             
             if side == 'BUY':
-                size = min(self.max_trade, max(self.min_trade, balance * self.copy_pct / 100))
-                if size < self.min_trade or balance < size:
-                    logger.warning(f"Insufficient balance: ${balance:.2f}")
+                if not size:
+                    logger.warning(f"Insufficient balance: ${available:.2f}")
                     return
                 
                 action_emoji = "🟢"
                 action_type = "OPENED" if my_size == 0 else "ADDED TO"
                 
             elif side == 'SELL':
-                if my_size <= 0:
+                if not size:
                     logger.info(f"No position to sell")
                     return
                 
-                # Estimate sell percentage (simplified)
-                sell_pct = min(100, (trade_size / my_size) * 100) if my_size > 0 else 100
-                size = (my_size * sell_pct) / 100
-                size = max(0.01, min(size, my_size))
-                
                 action_emoji = "🔴"
                 action_type = "CLOSED" if size >= my_size * 0.99 else "REDUCED"
                 
                 # P&L
-                avg_buy = my_position.get('avg_price', 0)
+                avg_buy = my_position.avg_price
                 pnl = (price - avg_buy) * size if avg_buy > 0 else 0
                 pnl_pct = ((price - avg_buy) / avg_buy) * 100 if avg_buy > 0 else 0
             else:
                 return
             
+            # Risk limits, from running aggregates (no /positions refetch)
+            notional = size * price
+            risk = follower.risk
+            reason = risk.check(token_id, trade.market, side, notional)
+            if reason:
+                metrics.incr('risk_rejected')
+                logger.warning(f"🛑 Risk blocked {side} ${notional:.2f} on {token_id[:10]}... for {follower.short}: {reason}")
+                return
+            
             # Execute order
+            from py_clob_client.clob_types import OrderArgs
             order = OrderArgs(token_id=token_id, price=price, size=size, side=side, fee_rate_bps=0)
-            signed = self.client.create_order(order)
-            resp = self.client.post_order(signed, OrderType.GTC)
+            # size is shares; the balance and risk reservations are both its USDC cost
+            reserved = notional if side == 'BUY' else 0.0
+            follower.reserved_balance += reserved
+            risk.reserve(token_id, reserved)
+            try:
+                resp = await follower.orders.submit(order, 'GTC')
+            finally:
+                follower.reserved_balance -= reserved
+                risk.release(token_id, reserved)
             
+            follower.successful += 1
             self.successful += 1
+            metrics.incr('trades_copied')
+            if trade.match_time:
+                metrics.observe('fill_to_ack', time.time() - trade.match_time)
             
-            # Update local position
-            if side == 'BUY':
-                new_size = my_size + size
-                new_avg = ((my_size * my_position.get('avg_price', 0)) + (size * price)) / new_size if new_size > 0 else price
-                self.my_positions[token_id] = {'size': new_size, 'avg_price': new_avg}
-            else:
-                new_size = max(0, my_size - size)
-                self.my_positions[token_id] = {'size': new_size, 'avg_price': my_position.get('avg_price', 0)}
+            account = f" for {follower.short}" if len(self.followers) > 1 else ""
+            
+            # Update local position and exposure
+            was_halted = risk.halted
+            risk.on_fill(token_id, side, size, price, my_position.avg_price)
+            new_size = follower.positions.apply_fill(token_id, side, size, price).size
+            if self.state:
+                self.state.append('fill', [follower.address, token_id, side, size, price])
+                if side == 'SELL':
+                    self.state.append('risk', {'address': follower.address, **risk.snapshot()})
+            if risk.halted and not was_halted:
+                self.send_tg(f"🛑 <b>KILL SWITCH</b>{account}\n\n{risk.halted}\nNew BUYs halted for today")
             
-            logger.info(f"✓ {side}: ${size:.2f} @ ${price:.4f}")
+            logger.info(f"✓ {side}: ${size:.2f} @ ${price:.4f} (copying {target.short}{account})")
             
             # Notification
             if side == 'SELL':
                 pnl_emoji = "📈" if pnl > 0 else "📉" if pnl < 0 else "➖"
-                await self.send_tg(f"""
-{action_emoji} <b>{action_type} POSITION!</b>
+                self.send_tg(f"""
+{action_emoji} <b>{action_type} POSITION!</b>{account}
 
 📉 Sold: ${size:.2f}
 💵 Price: ${price:.4f}
@@ -458,8 +2324,8 @@ class CopyTradingAgent:
 ✅ Success: {self.successful}/{self.total_trades}
                 """)
             else:
-                await self.send_tg(f"""
-{action_emoji} <b>{action_type} POSITION!</b>
+                self.send_tg(f"""
+{action_emoji} <b>{action_type} POSITION!</b>{account}
 
 📈 Size: ${size:.2f}
 💵 Price: ${price:.4f}
@@ -470,66 +2336,229 @@ class CopyTradingAgent:
                 """)
             
         except Exception as e:
-            logger.error(f"Trade failed: {e}")
+            metrics.error('copy_trade')
+            logger.error(f"Trade failed for {follower.short}: {e}")
+    
+    async def poll_target(self, target: TargetWallet) -> int:
+        # Bounded so N followed wallets never open more than MAX_CONCURRENT_POLLS requests
+        async with self.poll_slots:
+            trades = await self.fetch_trades(target)
+        
+        for trade in trades:
+            self.ingest(trade, target)
+        return len(trades)
+    
+    async def poll_loop(self, target: TargetWallet):
+        """Poll one wallet on its own adaptive schedule: fast while it trades, backing off while idle"""
+        # Spread the first polls of many wallets across one interval
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while True:
+            try:
+                wait = self.throttled_until - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait + random.uniform(0, self.interval))
+                
+                # REST polling runs whenever the stream is off or disconnected
+                if not (self.stream and self.stream.connected):
+                    if await self.poll_target(target):
+                        target.delay = self.min_poll
+                    else:
+                        target.delay = min(self.max_poll, max(self.min_poll, target.delay * self.poll_backoff))
+                else:
+                    target.delay = self.interval
+                
+                jitter = 1 + random.uniform(-self.poll_jitter, self.poll_jitter)
+                await asyncio.sleep(target.delay * jitter)
+            
+            except Exception as e:
+                logger.error(f"Monitor error: {e}")
+                await asyncio.sleep(5)
+    
+    async def catch_up(self):
+        """REST sweep of every wallet, run before the stream takes over after a (re)connect"""
+        await asyncio.gather(*(self.poll_target(t) for t in self.targets))
+    
+    def ingest(self, trade: Trade, target: TargetWallet):
+        """Single entry point for detected fills, from the poller or the stream"""
+        tid = trade.id
+        if self.processed.add(trade.key):
+            self.total_trades += 1
+            metrics.incr('trades_detected')
+            if self.state:
+                self.state.append('trade', trade.key)
+            if trade.match_time:
+                metrics.observe('fill_to_detect', time.time() - trade.match_time)
+            # Keep the REST cursor current so a fallback to polling doesn't replay streamed fills
+            target.advance([trade])
+            if self.recorder:
+                self.recorder.write(json.dumps(trade.to_dict()) + "\n")
+            
+            logger.info(f"⚡ NEW TRADE: {tid} ({target.short})")
+            if self.books:
+                self.books.track(trade.asset_id)
+            if self.netter:
+                self.netter.add(trade, target)
+            else:
+                self.schedule_copy(trade, target)
+    
+    def schedule_copy(self, trade: Trade, target: TargetWallet):
+        # One detected trade, one order per follower; each account keeps its own per-token lane
+        token_id = trade.asset_id
+        for follower in self.followers:
+            self.scheduler.submit((follower.address, token_id), lambda f=follower: self.copy_trade(trade, target, f))
     
     async def monitor(self):
         print(f"\n{Fore.GREEN}{'='*70}")
         print(f"{Fore.YELLOW}🚀 COPY TRADING AGENT ACTIVE!")
         print(f"{Fore.GREEN}{'='*70}")
         print(f"{Fore.WHITE}Your Wallet: {Fore.CYAN}{self.my_address}")
-        print(f"{Fore.WHITE}Copying:     {Fore.CYAN}{self.target_wallet}")
-        print(f"{Fore.WHITE}Copy %:      {Fore.CYAN}{self.copy_pct}%")
+        for follower in self.followers[1:]:
+            print(f"{Fore.WHITE}Follower:    {Fore.CYAN}{follower.address}")
+        for target in self.targets:
+            print(f"{Fore.WHITE}Copying:     {Fore.CYAN}{target.address} {Fore.WHITE}({target.copy_pct}%)")
         print(f"{Fore.WHITE}Speed:       {Fore.CYAN}{self.interval}s")
         print(f"{Fore.GREEN}{'='*70}\n")
         
-        balance = await self.get_balance()
-        await self.send_tg(f"""
-🤖 <b>BOT STARTED!</b>
-
-💰 Balance: ${balance:.2f}
-👤 Copying: {self.target_wallet[:10]}...
-📊 Copy %: {self.copy_pct}%
-
-🚀 Monitoring active!
-        """)
+        for follower in self.followers:
+            follower.orders.start()
+        if self.state:
+            self.state.start(self.snapshot_state)
+        if self.notifier:
+            self.notifier.start()
+        for follower in self.followers:
+            self.tasks.append(asyncio.create_task(follower.positions.reconcile_forever(self.reconcile_interval)))
+        if self.metrics_log_interval > 0:
+            self.tasks.append(asyncio.create_task(metrics.log_forever(self.metrics_log_interval)))
+        if self.diagnostics:
+            self.tasks.append(self.diagnostics.start())
+        if self.metrics_port:
+            routes = self.diagnostics.routes() if self.diagnostics else ()
+            self.metrics_runner = await metrics.serve(self.metrics_port, routes=routes)
+        if self.stream:
+            self.tasks.append(asyncio.create_task(self.stream.run()))
+        if self.books:
+            for follower in self.followers:
+                for token_id in follower.positions.positions:
+                    self.books.track(token_id)
+            self.tasks.append(asyncio.create_task(self.books.run()))
         
-        while True:
-            try:
-                trades = await self.fetch_trades()
-                
-                for trade in trades:
-                    tid = trade.get('id')
-                    if tid not in self.processed:
-                        self.processed.add(tid)
-                        self.total_trades += 1
-                        
-                        logger.info(f"⚡ NEW TRADE: {tid}")
-                        asyncio.create_task(self.copy_trade(trade))
-                
-                if len(self.processed) > 1000:
-                    self.processed = set(list(self.processed)[-500:])
-                
-                await asyncio.sleep(self.interval)
-                
-            except Exception as e:
-                logger.error(f"Monitor error: {e}")
-                await asyncio.sleep(5)
+        # Polling starts immediately; copies wait on self.ready while warm_up builds the clients
+        await asyncio.gather(self.warm_up(), *(self.poll_loop(t) for t in self.targets))
     
     async def run(self):
         try:
             await self.monitor()
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
             logger.info("Stopped by user")
-            await self.send_tg(f"🛑 <b>BOT STOPPED</b>\n\n✅ Success: {self.successful}/{self.total_trades}")
-            if self.session:
-                await self.session.close()
+            self.send_tg(f"🛑 <b>BOT STOPPED</b>\n\n✅ Success: {self.successful}/{self.total_trades}")
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            if self.diagnostics:
+                self.diagnostics.close()
+            if self.netter:
+                self.netter.flush_all()
+            await self.scheduler.close()
+            if self.metrics_runner:
+                await self.metrics_runner.cleanup()
+            if self.notifier:
+                await self.notifier.close()
+            for follower in self.followers:
+                await follower.orders.close()
+            if self.sign_pool:
+                self.sign_pool.shutdown(wait=False, cancel_futures=True)
+            if self.state:
+                await self.state.close()
+            await self.http.close()
+            self.processed.close()
+            if self.recorder:
+                self.recorder.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Polymarket Auto Copy Trading Agent")
+    parser.add_argument('--headless', action='store_true', help="non-interactive: no wizard, colors or auto-install; config must exist")
+    parser.add_argument('--config', default='config.json', help="config file (default: config.json)")
+    parser.add_argument('--diagnostics', action='store_true', help="loop lag monitor, blocked-loop stacks, SIGUSR1 profiler toggle")
+    parser.add_argument('--replay', metavar='FILE', help="backtest a recorded trade feed (.jsonl or .parquet) instead of trading")
+    parser.add_argument('--copy-pct', help="comma-separated COPY_PERCENTAGE values to sweep")
+    parser.add_argument('--min-trade', help="comma-separated MIN_TRADE_SIZE values to sweep")
+    parser.add_argument('--max-trade', help="comma-separated MAX_TRADE_SIZE values to sweep")
+    parser.add_argument('--balance', type=float, default=1000.0, help="starting USDC balance for replay")
+    parser.add_argument('--slippage-bps', type=float, default=50.0, help="adverse slippage applied to each simulated fill")
+    parser.add_argument('--workers', type=int, default=0, help="replay processes (default: one per core)")
+    return parser.parse_args()
+
+
+def run_replay(args, config: dict):
+    def values(arg, key, default):
+        return [float(v) for v in arg.split(',')] if arg else [float(config.get(key, default))]
+    
+    grid = [
+        {'copy_pct': c, 'min_trade': lo, 'max_trade': hi}
+        for c, lo, hi in itertools.product(
+            values(args.copy_pct, 'COPY_PERCENTAGE', 5),
+            values(args.min_trade, 'MIN_TRADE_SIZE', 1),
+            values(args.max_trade, 'MAX_TRADE_SIZE', 100)
+        )
+    ]
+    
+    start = time.perf_counter()
+    results = run_sweep(args.replay, grid, args.balance, args.slippage_bps, args.workers)
+    elapsed = time.perf_counter() - start
+    
+    print(f"\n{Fore.GREEN}{'='*70}")
+    print(f"{Fore.YELLOW}📼 REPLAY: {args.replay} ({len(grid)} parameter sets, {elapsed:.2f}s)")
+    print(f"{Fore.GREEN}{'='*70}")
+    print(f"{Fore.WHITE}{'Copy %':>7} {'Min $':>7} {'Max $':>7} {'Copied':>7} {'P&L $':>10} {'Realized':>10} {'Slippage':>9} {'Hit':>6}")
+    for r in sorted(results, key=lambda r: r['pnl'], reverse=True):
+        color = Fore.GREEN if r['pnl'] > 0 else Fore.RED
+        print(f"{color}{r['copy_pct']:>7g} {r['min_trade']:>7g} {r['max_trade']:>7g} {r['copied']:>7} "
+              f"{r['pnl']:>+10.2f} {r['realized_pnl']:>+10.2f} {r['slippage']:>9.2f} {r['hit_rate']:>6.1%}")
+
+
+def load_config(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def run_headless(config: dict):
+    """Non-interactive entry point for supervisors: straight from config to polling"""
+    agent = CopyTradingAgent(config)
+    try:
+        asyncio.run(agent.run())
+    except KeyboardInterrupt:
+        pass
 
 
 def main():
-    config_file = 'config.json'
+    args = parse_args()
+    config_file = args.config
+    
+    if args.headless:
+        config = load_config(config_file)
+        if args.replay:
+            run_replay(args, config or {})
+        elif config is None:
+            logger.error(f"{config_file} not found; run once without --headless to create it")
+            sys.exit(2)
+        else:
+            config['DIAGNOSTICS'] = config.get('DIAGNOSTICS') or args.diagnostics
+            run_headless(config)
+        return
+    
+    install_missing()
+    enable_colors()
+    
+    if args.replay:
+        run_replay(args, load_config(config_file) or {})
+        return
     
-    if not os.path.exists(config_file):
-        wizard = ConfigWizard()
+    config = load_config(config_file)
+    if config is None:
+        wizard = ConfigWizard(config_file)
         config = wizard.run_wizard()
         
         print(f"\n{Fore.GREEN}{'='*70}")
@@ -538,10 +2567,9 @@ def main():
         print(f"{Fore.WHITE}Starting bot in 3 seconds...")
         time.sleep(3)
     else:
-        with open(config_file, 'r') as f:
-            config = json.load(f)
         print(f"\n{Fore.GREEN}✓ Config loaded")
     
+    config['DIAGNOSTICS'] = config.get('DIAGNOSTICS') or args.diagnostics
     agent = CopyTradingAgent(config)
     
     try: